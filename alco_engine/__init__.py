@@ -0,0 +1,63 @@
+"""酒精路跑推薦引擎 - 不依賴 Streamlit 的資料載入、評分、營業時間與路線規劃
+
+    from alco_engine import load_catalogue, get_smart_recommendations, build_leg_table
+
+    df = load_catalogue()
+    route = get_smart_recommendations(df, preferences)
+    legs = build_leg_table(df, route)
+"""
+from .anchors import ANCHORS, anchor_distances, anchor_key, build_anchor_distances, build_anchor_table
+from .catalogue import DATA_PATH, load_catalogue, prepare_catalogue
+from .liquor import LIQUORS, build_liquor_index, matching_drinks, split_drinks
+from .lru import LRUCache
+from .opening_hours import (
+    WEEKDAYS,
+    get_visit_window,
+    open_during,
+    plan_arrival_slots,
+    slot_to_time,
+    slot_window_mask,
+    time_to_slot,
+)
+from .orienteering import DWELL_MINUTES, plan_orienteering_route, schedule_arrival_slots
+from .recommend import (
+    build_anchor_legs,
+    build_leg_table,
+    calculate_walking_time,
+    diversify_candidates,
+    get_cached_recommendations,
+    get_smart_recommendations,
+    optimize_route,
+    preference_fingerprint,
+    recommend_route,
+    recommendation_cache,
+)
+from .route_solver import solve_route
+from .scoring import (
+    calculate_advanced_score,
+    calculate_scores,
+    calculate_scores_batch,
+    decode_mask,
+    encode_profiles,
+    encode_selection,
+    estimated_spend,
+    parse_price_band,
+    within_budget,
+)
+from .spatial import (
+    DISTANCE_MATRIX_MAX_N,
+    DISTANCE_MODE,
+    EARTH_RADIUS_M,
+    build_distance_matrix,
+    route_distance_matrix,
+)
+from .synthetic import generate_catalogue, synthetic_catalogue
+from .timing import StageTimer, activate_timer, stage
+from .topk import streaming_top_k, top_k
+from .walking import (
+    WALKING_NETWORK_PATH,
+    WalkingDistances,
+    build_walking_matrix,
+    load_walking_graph,
+    load_walking_graph_if_present,
+)
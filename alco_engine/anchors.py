@@ -0,0 +1,77 @@
+"""路線錨點 - 固定的起點 / 終點（捷運站出口、計程車招呼站或自訂座標）
+
+每個具名錨點到所有酒吧的距離向量只需算一次（每個資料版本 N 個 float32），
+規劃路線時直接查表，不必在每次請求重新計算：
+
+    table = build_anchor_table(df, graph=graph)           # {錨點名稱: (N,) 公尺}
+    start = anchor_distances(df, '市政府站', table)
+    end = anchor_distances(df, (25.0372, 121.5668), table)  # 自訂座標不在表中時即時以直線距離計算
+
+偏好中的錨點可以是 ANCHORS 的名稱或 (lat, lng)；座標為出口 / 招呼站的概略位置。
+"""
+import numpy as np
+
+from .spatial import haversine_matrix
+from .walking import shortest_paths, snap_to_graph
+
+ANCHORS = {
+    '市政府站': (25.04120, 121.56540),
+    '象山站': (25.03290, 121.57020),
+    '台北101/世貿站': (25.03310, 121.56350),
+    '新光三越計程車招呼站': (25.03720, 121.56680),
+}
+# 自訂座標四捨五入到小數第 5 位（約 1 公尺）後當作快取鍵
+ANCHOR_PRECISION = 5
+
+
+def anchor_key(anchor):
+    """錨點的可雜湊鍵：名稱原樣回傳，座標四捨五入；None 表示不指定"""
+    if anchor is None or isinstance(anchor, str):
+        return anchor
+    lat, lng = anchor
+    return (round(float(lat), ANCHOR_PRECISION), round(float(lng), ANCHOR_PRECISION))
+
+
+def anchor_location(anchor):
+    """錨點座標 (lat, lng)；未知的名稱拋出 KeyError"""
+    if isinstance(anchor, str):
+        return ANCHORS[anchor]
+    return anchor_key(anchor)
+
+
+def anchor_label(anchor):
+    """顯示用名稱"""
+    if isinstance(anchor, str):
+        return anchor
+    lat, lng = anchor_key(anchor)
+    return f"({lat:.5f}, {lng:.5f})"
+
+
+def build_anchor_distances(df, lat, lng, graph=None):
+    """單一座標到所有酒吧的距離向量（(N,) float32 公尺）；有步行路網時為步行距離"""
+    lats = df['geometry_location_lat'].to_numpy(dtype=float)
+    lngs = df['geometry_location_lng'].to_numpy(dtype=float)
+    straight = haversine_matrix([lat], [lng], lats, lngs)[0]
+    if graph is None:
+        return straight.astype(np.float32)
+
+    nodes, snap = snap_to_graph(graph, np.append(lats, lat), np.append(lngs, lng))
+    unique_nodes, inverse = np.unique(nodes[:-1], return_inverse=True)
+    walk = shortest_paths(graph, int(nodes[-1]), unique_nodes)[inverse] + snap[:-1] + snap[-1]
+    return np.where(np.isfinite(walk), np.maximum(walk, straight), straight).astype(np.float32)
+
+
+def build_anchor_table(df, anchors=None, graph=None):
+    """預先計算各具名錨點到所有酒吧的距離向量"""
+    anchors = ANCHORS if anchors is None else anchors
+    return {name: build_anchor_distances(df, lat, lng, graph) for name, (lat, lng) in anchors.items()}
+
+
+def anchor_distances(df, anchor, table=None):
+    """錨點到所有酒吧的距離向量；優先查表，不在表中時以直線距離即時計算"""
+    if anchor is None:
+        return None
+    key = anchor_key(anchor)
+    if table is not None and key in table:
+        return table[key]
+    return build_anchor_distances(df, *anchor_location(anchor))
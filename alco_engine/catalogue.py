@@ -0,0 +1,165 @@
+"""酒吧資料載入與預處理 - 清理 CSV、產生衍生欄位，並維護欄式二進位快取
+
+快取存放於 CSV 旁的 <檔名>.npcache/ 目錄：每個欄位一個 .npy（數值欄位可 memory-map），
+meta.json 記錄 CSV 雜湊、欄位型別與 df.attrs。CSV 內容或 CACHE_SCHEMA_VERSION 變動時自動重建。
+
+建立快取：python -m alco_engine.catalogue [CSV 路徑] [--force]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .opening_hours import build_opening_hours_features
+from .scoring import build_score_features
+from .spatial import build_spatial_features
+
+DATA_PATH = "all_info_0522.csv"
+# 衍生欄位的計算方式改變時請遞增，讓既有快取失效
+CACHE_SCHEMA_VERSION = 4
+STRING_COLUMNS = ['bar_style', 'music_type', 'vicinity', 'price_level_monetary', 'top_3_selection']
+
+
+def prepare_catalogue(df, dataset_version):
+    """清理原始資料並產生所有衍生欄位"""
+    # 數據清理
+    df = df.dropna(subset=['final_name', 'geometry_location_lat', 'geometry_location_lng'])
+    df = df.reset_index(drop=True)
+    df['bar_idx'] = np.arange(len(df))  # 對應距離矩陣的列/欄索引
+    df.attrs['dataset_version'] = dataset_version
+    df['price_level'] = df['price_level'].fillna(2)
+    df['rating'] = df['rating'].fillna(3.5)
+
+    # 處理字符串字段中的NaN
+    for col in STRING_COLUMNS:
+        df[col] = df[col].fillna('N/A')
+
+    # 預先計算評分所需的數值欄位，避免每次推薦時逐列重算
+    df = build_score_features(df)
+    # 空間索引用的平面座標
+    df = build_spatial_features(df)
+    # 營業時間位元圖
+    df = build_opening_hours_features(df)
+    return df
+
+
+def file_digest(path):
+    """CSV 內容雜湊，作為資料版本"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def cache_dir_for(csv_path):
+    """CSV 對應的快取目錄"""
+    return os.path.splitext(csv_path)[0] + '.npcache'
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_catalogue_cache(df, cache_dir, csv_stat):
+    """將處理後的資料表寫成欄式快取（先寫暫存目錄再改名，避免讀到寫一半的快取）"""
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values):
+            kind = 'numeric'
+            np.save(os.path.join(tmp_dir, f'{i}.npy'), values.to_numpy())
+        else:
+            # 字串欄位存成固定寬度 unicode 陣列，缺值另存遮罩
+            kind = 'string'
+            isna = values.isna().to_numpy()
+            np.save(os.path.join(tmp_dir, f'{i}.npy'), np.array(values.fillna('').astype(str).tolist(), dtype=str))
+            if isna.any():
+                np.save(os.path.join(tmp_dir, f'{i}.isna.npy'), isna)
+        columns.append({'name': col, 'kind': kind})
+
+    meta = {
+        'schema_version': CACHE_SCHEMA_VERSION,
+        'dataset_version': df.attrs['dataset_version'],
+        'csv_size': csv_stat.st_size,
+        'csv_mtime_ns': csv_stat.st_mtime_ns,
+        'columns': columns,
+        'attrs': df.attrs,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def read_catalogue_cache(cache_dir, meta):
+    """讀取欄式快取；數值欄位以 memory-map 方式載入"""
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        path = os.path.join(cache_dir, f'{i}.npy')
+        if column['kind'] == 'numeric':
+            data[column['name']] = np.load(path, mmap_mode='r')
+        else:
+            values = np.load(path).astype(object)
+            isna_path = os.path.join(cache_dir, f'{i}.isna.npy')
+            if os.path.exists(isna_path):
+                values[np.load(isna_path)] = np.nan
+            data[column['name']] = values
+    df = pd.DataFrame(data, copy=False)
+    df.attrs.update(meta['attrs'])
+    df.attrs['projection_origin'] = tuple(df.attrs['projection_origin'])
+    return df
+
+
+def load_catalogue(csv_path=DATA_PATH, use_cache=True, force_rebuild=False):
+    """載入酒吧資料：快取有效時直接讀取，否則解析 CSV 並重建快取"""
+    csv_stat = os.stat(csv_path)
+    cache_dir = cache_dir_for(csv_path)
+
+    dataset_version = None
+    if use_cache and not force_rebuild:
+        meta = _read_meta(cache_dir)
+        if meta and meta.get('schema_version') == CACHE_SCHEMA_VERSION:
+            # 檔案大小與修改時間都沒變時略過雜湊；有變動再以內容雜湊確認
+            unchanged = (meta['csv_size'] == csv_stat.st_size
+                         and meta['csv_mtime_ns'] == csv_stat.st_mtime_ns)
+            if not unchanged:
+                dataset_version = file_digest(csv_path)
+            if unchanged or meta['dataset_version'] == dataset_version:
+                try:
+                    return read_catalogue_cache(cache_dir, meta)
+                except (OSError, ValueError, KeyError):
+                    pass
+
+    if dataset_version is None:
+        dataset_version = file_digest(csv_path)
+    df = prepare_catalogue(pd.read_csv(csv_path), dataset_version)
+    if use_cache:
+        try:
+            write_catalogue_cache(df, cache_dir, csv_stat)
+        except OSError:
+            # 唯讀檔案系統等情況仍可使用，只是沒有快取
+            pass
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="建立酒吧資料的欄式快取")
+    parser.add_argument("csv_path", nargs="?", default=DATA_PATH)
+    parser.add_argument("--force", action="store_true", help="忽略現有快取，強制重建")
+    args = parser.parse_args()
+    catalogue = load_catalogue(args.csv_path, force_rebuild=args.force)
+    print(f"✅ {len(catalogue)} 間酒吧 → {cache_dir_for(args.csv_path)}（版本 {catalogue.attrs['dataset_version']}）")
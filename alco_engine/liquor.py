@@ -0,0 +1,141 @@
+"""基酒 - 從 top_3_selection 的酒款與材料辨識基酒，並建立基酒 → 酒款的倒排索引
+
+top_3_selection 為以「, 」分隔的酒款，材料寫在全形或半形括號內，例如
+'SOUR SOUR WHISKY（杏桃、百香果、威士忌、香艾酒）, 芭樂鹽小麥（芭樂、精釀啤酒、甘梅粉）'。
+括號內的逗號不切分酒款；材料以頓號、斜線、分號等分隔，不以空白切分，'ginger beer' 才能整體判斷。
+同義詞（whisky / 威士忌、萊姆酒 / 朗姆酒 / 蘭姆酒）正規化為 LIQUORS 中的名稱；
+單獨的「萊姆」是萊姆果（lime），薑汁汽水（ginger ale / ginger beer）也不是啤酒。
+
+每種 top_3_selection 字串只解析一次：載入時產生每間酒吧的 liquor_mask（評分與篩選酒吧都用它），
+build_liquor_index 則產生基酒 → 符合的酒款名稱，供路線面板查詢。
+"""
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+# 與問卷（simple-streamlit.py）相同的 14 種基酒，順序即 liquor_mask 的位元順序
+LIQUORS = ['琴酒', '蘭姆酒', '伏特加', '龍舌蘭', '香艾酒', '白蘭地', '威士忌',
+           '利口酒', '茶酒', '啤酒', '梅酒', '紅白酒', '高粱', '清酒']
+# 各基酒的同義詞；英文詞不分大小寫且須為完整單字，其餘為子字串比對（可用正規表示式）
+LIQUOR_SYNONYMS = {
+    '琴酒': ['琴酒', 'gin'],
+    '蘭姆酒': ['蘭姆', '朗姆', '萊姆酒', '薩凱帕', 'rum', 'zacapa'],
+    '伏特加': ['伏特加', 'vodka'],
+    '龍舌蘭': ['龍舌蘭', 'tequila', 'mezcal'],
+    '香艾酒': ['香艾酒', 'vermouth'],
+    '白蘭地': ['白蘭地', '干邑', 'brandy', 'cognac'],
+    '威士忌': ['威士忌', '波本', 'whisky', 'whiskey', 'bourbon', 'scotch'],
+    '利口酒': ['利口酒', '香甜酒', '君度', '金巴利', '野格', '奶酒', '咖啡酒', '可可酒',
+            'liqueur', 'campari', 'cointreau'],
+    '茶酒': ['(?<!冰)茶', '烏龍', '鐵觀音', '碧螺春', 'tea'],  # 長島冰茶沒有茶
+    # 薑汁汽水（ginger ale / ginger beer）與沙士（root beer）不是啤酒
+    '啤酒': ['(?<!薑汁)(?<!根汁)啤酒(?!花)', '生啤', '(?<!ginger[ -])(?<!root[ -])beer',
+           'ipa', 'lager', 'stout', '(?<!ginger[ -])ale', 'pilsner'],
+    '梅酒': ['梅酒', 'umeshu'],
+    '紅白酒': ['紅酒', '白酒', '葡萄酒', '香檳', '氣泡酒', 'wine', 'champagne', 'prosecco', 'sangria'],
+    '高粱': ['高粱', 'kaoliang'],
+    '清酒': ['清酒', '吟釀', '純米', 'sake'],
+}
+# 標示無酒精的酒款不列入任何基酒
+NON_ALCOHOLIC = '無酒精'
+INGREDIENT_SEPARATORS = re.compile(r'[、／/，,；;:：+（）()]+')
+OPEN_PARENS = '（('
+CLOSE_PARENS = '）)'
+
+
+def _synonym_pattern(words):
+    """同義詞合成一個正規表示式；英文詞（不含中文的詞）前後不可緊接英文字母"""
+    parts = [rf'(?<![a-z]){w}(?![a-z])' if w.isascii() else w for w in words]
+    return re.compile('|'.join(parts))
+
+
+LIQUOR_PATTERNS = {liquor: _synonym_pattern(words) for liquor, words in LIQUOR_SYNONYMS.items()}
+
+
+def split_drinks(text):
+    """將 top_3_selection 切分為 [(酒款名稱, [材料, ...]), ...]；括號內的逗號不視為酒款分隔"""
+    if not isinstance(text, str) or text == 'N/A':
+        return []
+    items, start, depth = [], 0, 0
+    for i, char in enumerate(text):
+        if char in OPEN_PARENS:
+            depth += 1
+        elif char in CLOSE_PARENS:
+            depth = max(0, depth - 1)
+        elif char == ',' and depth == 0:
+            items.append(text[start:i])
+            start = i + 1
+    items.append(text[start:])
+
+    drinks = []
+    for item in items:
+        paren = next((i for i, char in enumerate(item) if char in OPEN_PARENS), len(item))
+        name = item[:paren].strip()
+        ingredients = [t.strip() for t in INGREDIENT_SEPARATORS.split(item[paren:]) if t.strip()]
+        if name or ingredients:
+            drinks.append((name, ingredients))
+    return drinks
+
+
+@functools.lru_cache(maxsize=4096)
+def match_liquors(token):
+    """單一酒款名稱或材料對應到的基酒（frozenset）"""
+    token = token.lower()
+    return frozenset(liquor for liquor, pattern in LIQUOR_PATTERNS.items() if pattern.search(token))
+
+
+def parse_liquors(text):
+    """解析一個 top_3_selection 字串，回傳 [(酒款名稱, 基酒集合), ...]"""
+    parsed = []
+    for name, ingredients in split_drinks(text):
+        if NON_ALCOHOLIC in name or any(NON_ALCOHOLIC in t for t in ingredients):
+            liquors = frozenset()
+        else:
+            liquors = frozenset().union(*(match_liquors(t) for t in [name, *ingredients] if t))
+        parsed.append((name, liquors))
+    return parsed
+
+
+def extract_liquors(text):
+    """一間酒吧酒單中出現的所有基酒"""
+    return frozenset().union(*(liquors for _, liquors in parse_liquors(text)))
+
+
+def liquor_masks(texts):
+    """每間酒吧的基酒位元遮罩（uint64，位元順序同 LIQUORS）；每種字串只解析一次"""
+    codes, values = pd.factorize(pd.Series(texts))
+    bit_of = {liquor: np.uint64(1) << np.uint64(i) for i, liquor in enumerate(LIQUORS)}
+    masks = np.zeros(len(values) + 1, dtype=np.uint64)  # 最後一格給缺值（codes 為 -1）
+    for i, text in enumerate(values):
+        for liquor in extract_liquors(text):
+            masks[i] |= bit_of[liquor]
+    return masks[codes]
+
+
+def build_liquor_index(df):
+    """基酒 → 酒款倒排索引
+
+    回傳 {'drinks': {基酒: {酒單代碼: [酒款名稱, ...]}}, 'menu_code': 每列的酒單代碼}；
+    相同酒單的酒吧共用代碼，查詢某列符合的酒款請用 matching_drinks。
+    含某基酒的酒吧請直接以 liquor_mask 篩選。
+    """
+    codes, values = pd.factorize(df['top_3_selection'])
+    drinks = {liquor: {} for liquor in LIQUORS}
+    for code, text in enumerate(values):
+        for name, liquors in parse_liquors(text):
+            for liquor in liquors:
+                drinks[liquor].setdefault(code, []).append(name)
+    return {'drinks': drinks, 'menu_code': codes}
+
+
+def matching_drinks(index, row, liquors):
+    """某列酒吧中含有指定基酒的酒款：{基酒: [酒款名稱, ...]}，沒有符合的基酒不列出"""
+    code = index['menu_code'][row]
+    result = {}
+    for liquor in liquors:
+        names = index['drinks'].get(liquor, {}).get(code)
+        if names:
+            result[liquor] = names
+    return result
@@ -0,0 +1,111 @@
+"""營業時間 - 解析 opening_hours_weekday_text 並以位元圖判斷造訪時段是否營業"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# 營業時間位元圖：每晚 18:00 至次日 04:00，每 15 分鐘一格，共 40 格
+WEEKDAYS = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+NIGHT_START_HOUR = 18
+SLOT_MINUTES = 15
+NIGHT_SLOTS = 40
+ALL_NIGHT_SLOTS = (1 << NIGHT_SLOTS) - 1
+_HOURS_INTERVAL = re.compile(r'(\d{1,2}):(\d{2})\s*[–-]\s*(\d{1,2}):(\d{2})')
+
+
+def parse_opening_hours(text):
+    """將 opening_hours_weekday_text 解析為每個星期晚上的營業時段遮罩（7 個 int）
+
+    跨午夜的營業時間歸入前一晚，例如「星期一: 20:00 – 02:00」會佔用星期一晚上 20:00 至次日 02:00。
+    無營業時間資料時視為整晚營業，不排除該酒吧。
+    """
+    if not isinstance(text, str) or not any(day in text for day in WEEKDAYS):
+        return [ALL_NIGHT_SLOTS] * 7
+
+    week_quarters = 7 * 24 * 60 // SLOT_MINUTES
+    open_quarters = np.zeros(week_quarters, dtype=bool)
+    for part in text.split(';'):
+        day_name, _, hours = part.strip().partition(':')
+        if day_name.strip() not in WEEKDAYS:
+            continue
+        day_start = WEEKDAYS.index(day_name.strip()) * 24 * 60
+        if '24 小時營業' in hours:
+            open_quarters[day_start // SLOT_MINUTES:(day_start + 24 * 60) // SLOT_MINUTES] = True
+            continue
+        for oh, om, ch, cm in _HOURS_INTERVAL.findall(hours):
+            opens = int(oh) * 60 + int(om)
+            closes = int(ch) * 60 + int(cm)
+            if closes <= opens:
+                closes += 24 * 60
+            first = -(-(day_start + opens) // SLOT_MINUTES)  # 營業時間內開始的第一格
+            last = -(-(day_start + closes) // SLOT_MINUTES)
+            open_quarters[np.arange(first, last) % week_quarters] = True
+
+    masks = []
+    for day in range(7):
+        first = (day * 24 * 60 + NIGHT_START_HOUR * 60) // SLOT_MINUTES
+        slots = open_quarters[np.arange(first, first + NIGHT_SLOTS) % week_quarters]
+        masks.append(int(np.dot(slots.astype(np.uint64), np.uint64(1) << np.arange(NIGHT_SLOTS, dtype=np.uint64))))
+    return masks
+
+
+def build_opening_hours_features(df):
+    """解析營業時間，產生 open_slots_0 ~ open_slots_6（星期一～星期日晚上）uint64 欄位"""
+    df = df.copy()
+    # 營業時間字串重複度很高，每種字串只解析一次
+    codes, texts = pd.factorize(df['opening_hours_weekday_text'], use_na_sentinel=False)
+    parsed = np.array([parse_opening_hours(text) for text in texts], dtype=np.uint64).reshape(len(texts), 7)
+    masks = parsed[codes]
+    for day in range(7):
+        df[f'open_slots_{day}'] = masks[:, day]
+    return df
+
+
+def time_to_slot(time_label):
+    """將「19:00」或「次日 02:00」轉為晚間時段格數（18:00 為 0）"""
+    hour, minute = map(int, time_label.replace('次日', '').strip().split(':'))
+    if '次日' in time_label or hour < NIGHT_START_HOUR:
+        hour += 24
+    return ((hour - NIGHT_START_HOUR) * 60 + minute) // SLOT_MINUTES
+
+
+def slot_to_time(slot):
+    """晚間時段格數轉回時間字串"""
+    minutes = NIGHT_START_HOUR * 60 + int(slot) * SLOT_MINUTES
+    hour, minute = divmod(minutes, 60)
+    if hour >= 24:
+        return f"次日 {hour - 24:02d}:{minute:02d}"
+    return f"{hour:02d}:{minute:02d}"
+
+
+def slot_window_mask(start_slot, end_slot):
+    """[start_slot, end_slot) 時段的位元遮罩"""
+    start_slot = max(0, start_slot)
+    end_slot = min(NIGHT_SLOTS, end_slot)
+    if end_slot <= start_slot:
+        return np.uint64(0)
+    return np.uint64(((1 << (end_slot - start_slot)) - 1) << start_slot)
+
+
+def get_visit_window(preferences):
+    """取得偏好中的造訪星期與時段；未設定星期或時段無效時回傳 None"""
+    weekday = preferences.get('weekday')
+    if weekday not in WEEKDAYS:
+        return None
+    start_slot = time_to_slot(preferences.get('time_start', '19:00'))
+    end_slot = time_to_slot(preferences.get('time_end', '23:00'))
+    if end_slot <= start_slot:
+        return None
+    return WEEKDAYS.index(weekday), start_slot, end_slot
+
+
+def plan_arrival_slots(start_slot, end_slot, n_stops):
+    """將時段平均分配給各站，回傳每站的預計抵達時段"""
+    stay = (end_slot - start_slot) / max(n_stops, 1)
+    return [start_slot + int(p * stay) for p in range(n_stops)]
+
+
+def open_during(df, weekday, start_slot, end_slot):
+    """向量化判斷每間酒吧在該晚的時段內是否有營業"""
+    window = slot_window_mask(start_slot, end_slot)
+    return (df[f'open_slots_{weekday}'].to_numpy(dtype=np.uint64) & window) != 0
@@ -0,0 +1,178 @@
+"""定向越野路線 - 在造訪時段內同時決定要去哪些酒吧與造訪順序
+
+目標是最大化路線上酒吧的推薦分數總和，限制為：
+每站停留 dwell_minutes 分鐘、站與站之間的步行時間、最後一站須在結束時間前離開，
+且每站抵達時該酒吧有營業；設定整晚預算時，各站預估花費總和不得超過預算。
+指定起點 / 終點錨點時，從錨點走到第一站、最後一站走到錨點的時間也計入時段。
+先以「分數 / 增加時間」貪婪插入，再在計算預算內反覆移除部分站點後重新插入（含 2-opt 縮短步行），
+保留分數最高（同分時總時間最短）的解。
+"""
+import random
+import time
+
+import numpy as np
+
+from .opening_hours import SLOT_MINUTES, get_visit_window, open_during
+from .scoring import calculate_scores, estimated_spend
+from .spatial import route_distance_matrix
+from .topk import top_k
+
+DWELL_MINUTES = 45              # 每站預設停留時間
+ORIENTEERING_POOL = 40          # 只在分數最高的這些酒吧中挑選
+ORIENTEERING_TIME_BUDGET = 0.15  # 秒；超過即回傳目前最佳解
+ORIENTEERING_MAX_ITERATIONS = 2000
+
+
+def walking_minutes(meters, speed_kmh=4.5):
+    """步行分鐘數（無條件進位，與 calculate_walking_time 相同）"""
+    return np.ceil(np.asarray(meters, dtype=float) / (speed_kmh * 1000 / 60))
+
+
+def schedule_arrival_slots(start_slot, leg_minutes, dwell_minutes=DWELL_MINUTES, lead_minutes=0):
+    """依停留時間與各段步行分鐘推算每站的抵達時段；lead_minutes 為從起點錨點走到第一站的時間"""
+    elapsed = lead_minutes
+    slots = [start_slot + int(elapsed // SLOT_MINUTES)]
+    for minutes in leg_minutes:
+        elapsed += dwell_minutes + minutes
+        slots.append(start_slot + int(elapsed // SLOT_MINUTES))
+    return slots
+
+
+class _Problem:
+    """候選池上的子問題：步行分鐘矩陣、分數與營業位元"""
+
+    def __init__(self, values, travel, open_slots, start_slot, end_slot, dwell, max_stops,
+                 start_travel=None, end_travel=None, spend=None, budget=None):
+        self.values = values
+        self.travel = travel
+        self.start_travel = start_travel
+        self.end_travel = end_travel
+        self.spend = spend
+        self.budget = budget
+        self.open_slots = open_slots
+        self.start_slot = start_slot
+        self.horizon = (end_slot - start_slot) * SLOT_MINUTES
+        self.dwell = dwell
+        self.max_stops = max_stops
+
+    def duration(self, route):
+        """走完路線所需分鐘；不可行（超時、超出預算或抵達時未營業）時回傳 None"""
+        if self.budget is not None and sum(self.spend[bar] for bar in route) > self.budget:
+            return None
+        elapsed = 0.0 if self.start_travel is None or not route else float(self.start_travel[route[0]])
+        for pos, bar in enumerate(route):
+            if pos:
+                elapsed += self.dwell + self.travel[route[pos - 1], bar]
+            slot = self.start_slot + int(elapsed // SLOT_MINUTES)
+            if not (int(self.open_slots[bar]) >> slot) & 1:
+                return None
+        total = elapsed + self.dwell
+        if self.end_travel is not None and route:
+            total += self.end_travel[route[-1]]
+        return total if total <= self.horizon else None
+
+    def value(self, route):
+        return float(sum(self.values[b] for b in route))
+
+    def insert_greedily(self, route):
+        """反覆插入「分數 / 增加時間」最高的可行酒吧，直到無法再插入"""
+        route = list(route)
+        base = self.duration(route) if route else 0.0
+        while len(route) < self.max_stops:
+            visited = set(route)
+            best = None
+            for bar in range(len(self.values)):
+                if bar in visited:
+                    continue
+                for pos in range(len(route) + 1):
+                    candidate = route[:pos] + [bar] + route[pos:]
+                    total = self.duration(candidate)
+                    if total is None:
+                        continue
+                    ratio = self.values[bar] / (total - base + 1.0)
+                    if best is None or ratio > best[0]:
+                        best = (ratio, candidate, total)
+            if best is None:
+                break
+            _, route, base = best
+        return route
+
+    def two_opt(self, route):
+        """在保持可行的前提下反轉區段縮短總時間"""
+        best_total = self.duration(route)
+        improved = best_total is not None
+        while improved:
+            improved = False
+            for i in range(len(route) - 1):
+                for j in range(i + 2, len(route) + 1):
+                    candidate = route[:i] + route[i:j][::-1] + route[j:]
+                    total = self.duration(candidate)
+                    if total is not None and total < best_total - 1e-9:
+                        route, best_total, improved = candidate, total, True
+        return route
+
+
+def solve_orienteering(problem, time_budget=ORIENTEERING_TIME_BUDGET,
+                       max_iterations=ORIENTEERING_MAX_ITERATIONS, seed=0):
+    """貪婪建構 + 移除/重新插入的迭代區域搜尋，回傳候選池內的索引路線"""
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_budget
+
+    def improve(route):
+        return problem.insert_greedily(problem.two_opt(route))
+
+    best = improve([])
+    best_key = (problem.value(best), -(problem.duration(best) or 0.0))
+    current = best
+    for _ in range(max_iterations):
+        if time.perf_counter() >= deadline or not current:
+            break
+        # 隨機移除 1～2 站，再重新插入
+        candidate = list(current)
+        for _ in range(min(len(candidate), rng.randint(1, 2))):
+            candidate.pop(rng.randrange(len(candidate)))
+        # 移除後抵達時間提前，可能遇到尚未開門的酒吧
+        if candidate and problem.duration(candidate) is None:
+            current = best
+            continue
+        candidate = improve(candidate)
+        key = (problem.value(candidate), -(problem.duration(candidate) or 0.0))
+        if key > best_key:
+            best, best_key = candidate, key
+        # 接受不比目前差的解以跳出區域最佳，否則回到最佳解
+        current = candidate if key >= (problem.value(current), -(problem.duration(current) or 0.0)) else best
+    return best
+
+
+def plan_orienteering_route(df, preferences, top_n=6, dist=None, dwell_minutes=DWELL_MINUTES,
+                            pool_size=ORIENTEERING_POOL, time_budget=ORIENTEERING_TIME_BUDGET, speed_kmh=4.5,
+                            start_dist=None, end_dist=None):
+    """依造訪時段同時挑選酒吧與排序，回傳依造訪順序排列的列索引
+
+    最多 top_n 站；時段內排不下的站數會自動減少。沒有有效造訪時段時回傳空陣列。
+    start_dist / end_dist 為起點 / 終點錨點到所有酒吧的距離向量。
+    """
+    visit_window = get_visit_window(preferences)
+    if not visit_window:
+        return np.empty(0, dtype=np.int64)
+    weekday, start_slot, end_slot = visit_window
+
+    scores = calculate_scores(df, preferences)
+    eligible = np.flatnonzero(open_during(df, *visit_window))
+    pool = np.asarray(top_k(scores[eligible], pool_size, index=eligible), dtype=np.int64)
+    if len(pool) == 0:
+        return pool
+
+    bars = df.iloc[pool]
+    bar_idx = np.asarray(bars['bar_idx'], dtype=np.int64)
+    problem = _Problem(
+        values=scores[pool],
+        travel=walking_minutes(route_distance_matrix(bars, dist), speed_kmh),
+        open_slots=np.asarray(bars[f'open_slots_{weekday}'], dtype=np.uint64),
+        start_slot=start_slot, end_slot=end_slot, dwell=dwell_minutes, max_stops=top_n,
+        start_travel=None if start_dist is None else walking_minutes(start_dist[bar_idx], speed_kmh),
+        end_travel=None if end_dist is None else walking_minutes(end_dist[bar_idx], speed_kmh),
+        spend=estimated_spend(bars), budget=preferences.get('night_budget') or None,
+    )
+    route = solve_orienteering(problem, time_budget=time_budget)
+    return pool[np.asarray(route, dtype=np.int64)]
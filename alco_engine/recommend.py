@@ -0,0 +1,255 @@
+"""推薦流程 - 候選挑選、地理分散、路線排序與路段表"""
+import math
+
+import numpy as np
+
+from .anchors import anchor_distances, anchor_key, anchor_label, anchor_location
+from .lru import LRUCache
+from .opening_hours import get_visit_window, open_during, plan_arrival_slots
+from .orienteering import DWELL_MINUTES, plan_orienteering_route
+from .route_solver import solve_route
+from .scoring import calculate_scores, estimated_spend, within_budget
+from .spatial import GRID_CELL_MARGIN, bar_distance, grid_cell, grid_neighbours, route_distance_matrix
+from .timing import stage
+from .topk import top_k
+
+# 路線求解模式：'auto'（≤12 站精確解，否則 2-opt/Or-opt）、'exact'、'heuristic'、'anytime'
+ROUTE_SOLVER_MODE = 'auto'
+# 抵達時未營業的懲罰（以公尺計入路線成本）
+CLOSED_PENALTY_M = 1e6
+# 推薦結果快取：整個行程共用；鍵含資料版本，資料更新後舊項目不會再被命中，由 LRU/TTL 淘汰
+RECOMMENDATION_CACHE_SIZE = 256
+RECOMMENDATION_CACHE_TTL = 600  # 秒
+recommendation_cache = LRUCache(RECOMMENDATION_CACHE_SIZE, ttl=RECOMMENDATION_CACHE_TTL)
+
+
+def arrival_penalty(recommendations, visit_window):
+    """第 i 間酒吧排在第 p 站時，若預計抵達時段未營業則給予懲罰"""
+    weekday, start_slot, end_slot = visit_window
+    n = len(recommendations)
+    arrival_bits = np.array([np.uint64(1) << np.uint64(slot)
+                             for slot in plan_arrival_slots(start_slot, end_slot, n)], dtype=np.uint64)
+    open_slots = np.asarray(recommendations[f'open_slots_{weekday}'], dtype=np.uint64)
+    is_open = (open_slots[:, None] & arrival_bits[None, :]) != 0
+    return np.where(is_open, 0.0, CLOSED_PENALTY_M)
+
+
+def optimize_route(df, route_idx, dist=None, mode=ROUTE_SOLVER_MODE, visit_window=None,
+                   start_dist=None, end_dist=None):
+    """路線優化 - 求最短步行路線，並盡量在營業時間內抵達
+
+    沒有起點錨點時起點固定為評分最高的酒吧。start_dist / end_dist 為起點 / 終點錨點到
+    所有酒吧的距離向量（見 anchors.anchor_distances），給定時路線從錨點出發、在錨點結束。
+    route_idx 為酒吧在 df 中的列索引，回傳重新排序後的列索引（不含錨點）。
+    """
+    route_idx = np.asarray(route_idx, dtype=np.int64)
+    if len(route_idx) <= 1 or (len(route_idx) == 2 and start_dist is None):
+        return route_idx
+
+    bars = df.iloc[route_idx]
+    distances = route_distance_matrix(bars, dist)
+    penalty = arrival_penalty(bars, visit_window) if visit_window else None
+    if start_dist is None and end_dist is None:
+        order = solve_route(distances, mode, start=0, penalty=penalty)
+        return route_idx[order]
+
+    # 錨點加在矩陣前後：[起點錨點] + 酒吧 + [終點錨點]
+    bar_idx = np.asarray(bars['bar_idx'], dtype=np.int64)
+    offset = 0 if start_dist is None else 1
+    k = len(route_idx)
+    size = offset + k + (end_dist is not None)
+    augmented = np.zeros((size, size))
+    augmented[offset:offset + k, offset:offset + k] = distances
+    if start_dist is not None:
+        augmented[0, 1:k + 1] = augmented[1:k + 1, 0] = start_dist[bar_idx]
+    if end_dist is not None:
+        augmented[-1, offset:offset + k] = augmented[offset:offset + k, -1] = end_dist[bar_idx]
+    full_penalty = None
+    if penalty is not None:
+        full_penalty = np.zeros((size, size))
+        full_penalty[offset:offset + k, offset:offset + k] = penalty
+    order = solve_route(augmented, mode, start=0, penalty=full_penalty,
+                        end=size - 1 if end_dist is not None else None)
+
+    positions = np.asarray([i - offset for i in order if offset <= i < offset + k], dtype=np.int64)
+    return route_idx[positions]
+
+
+def diversify_candidates(df, candidates, top_n, dist=None, min_distance=300):
+    """地理分散性考慮 - 依分數順序挑選彼此相距至少 min_distance 公尺的酒吧，不足時以高分酒吧補齊"""
+    selected = []
+
+    # 已選酒吧放入以 min_distance 為邊長的空間網格，只需檢查相鄰格子
+    cell_size = min_distance * GRID_CELL_MARGIN
+    used_grid = {}
+    bar_idx = df['bar_idx'].to_numpy()
+    lats = df['geometry_location_lat'].to_numpy()
+    lngs = df['geometry_location_lng'].to_numpy()
+    proj_x = df['proj_x'].to_numpy()
+    proj_y = df['proj_y'].to_numpy()
+
+    for row in candidates:
+        if len(selected) >= top_n:
+            break
+
+        cell = grid_cell(proj_x[row], proj_y[row], cell_size)
+
+        # 檢查與鄰近已選酒吧的距離
+        too_close = False
+        for used in grid_neighbours(used_grid, cell):
+            if bar_distance(dist, bar_idx[row], bar_idx[used],
+                            lats[row], lngs[row], lats[used], lngs[used]) < min_distance:
+                too_close = True
+                break
+
+        if not too_close:
+            selected.append(row)
+            used_grid.setdefault(cell, []).append(row)
+
+    # 如果地理分散後數量不足，補充剩餘的高分酒吧
+    if len(selected) < top_n:
+        chosen = set(selected)
+        selected.extend([row for row in candidates if row not in chosen][:top_n - len(selected)])
+
+    return np.asarray(selected, dtype=np.int64)
+
+
+def get_smart_recommendations(df, preferences, top_n=6, dist=None, anchor_table=None):
+    """智能推薦系統 - 回傳依造訪順序排列的酒吧列索引
+
+    df 為所有 session 共用的唯讀資料表，分數只存在本次請求的陣列中，不寫回 df。
+    dist 為 None 時改以座標即時計算所需的距離；anchor_table 為預先計算的錨點距離向量。
+    """
+    # 計算推薦分數
+    with stage('score', n_bars=len(df)):
+        scores = calculate_scores(df, preferences)
+
+    # 只保留造訪時段內有營業的酒吧
+    visit_window = get_visit_window(preferences)
+    eligible = np.arange(len(df))
+    if visit_window:
+        with stage('open_filter'):
+            eligible = eligible[open_during(df, *visit_window)]
+
+    # 選擇前N個候選（argpartition，同分時保留原順序，與 DataFrame.nlargest 相同）
+    with stage('top_k'):
+        candidates = top_k(scores[eligible], top_n * 2, index=eligible)
+
+    # 地理分散性考慮 - 避免所有酒吧都在同一區域
+    with stage('diversify'):
+        route_idx = diversify_candidates(df, candidates, top_n, dist)
+
+    # 整晚預算：依分數順序累加預估花費，超出預算的站點不列入
+    night_budget = preferences.get('night_budget')
+    if night_budget:
+        route_idx = route_idx[:within_budget(estimated_spend(df.iloc[route_idx]), night_budget)]
+
+    # 路線優化
+    with stage('optimize_route'):
+        return optimize_route(df, route_idx, dist, visit_window=visit_window,
+                              start_dist=anchor_distances(df, preferences.get('start_anchor'), anchor_table),
+                              end_dist=anchor_distances(df, preferences.get('end_anchor'), anchor_table))
+
+
+def preference_fingerprint(preferences):
+    """將偏好正規化為可雜湊的指紋，只保留會影響推薦結果的部分
+
+    未勾選的項目、勾選順序與場地偏好（目前不參與評分）不影響指紋；勾選「沒有偏好」時其他勾選也無關。
+    """
+    def selection(key):
+        pref = preferences.get(key, {})
+        if pref.get('沒有偏好', False):
+            return ('沒有偏好',)
+        return tuple(sorted(k for k, v in pref.items() if v and k != '沒有偏好'))
+
+    planner = preferences.get('planner', 'ranked')
+    return (
+        float(preferences.get('price_point', 500)),
+        selection('bar_styles'),
+        selection('music_types'),
+        selection('liquors'),
+        get_visit_window(preferences),
+        planner,
+        preferences.get('dwell_minutes', DWELL_MINUTES) if planner == 'orienteering' else None,
+        anchor_key(preferences.get('start_anchor')),
+        anchor_key(preferences.get('end_anchor')),
+        preferences.get('night_budget') or None,
+    )
+
+
+def recommend_route(df, preferences, top_n=6, dist=None, anchor_table=None):
+    """依偏好中的 planner 選擇規劃方式：'ranked'（先挑候選再排序）或 'orienteering'（依時段同時挑選與排序）
+
+    orienteering 需要有效的造訪時段，沒有時改用 ranked。
+    """
+    if preferences.get('planner') == 'orienteering' and get_visit_window(preferences):
+        return plan_orienteering_route(df, preferences, top_n, dist,
+                                       dwell_minutes=preferences.get('dwell_minutes', DWELL_MINUTES),
+                                       start_dist=anchor_distances(df, preferences.get('start_anchor'), anchor_table),
+                                       end_dist=anchor_distances(df, preferences.get('end_anchor'), anchor_table))
+    return get_smart_recommendations(df, preferences, top_n, dist, anchor_table)
+
+
+def get_cached_recommendations(df, preferences, top_n=6, dist=None, cache=recommendation_cache,
+                               anchor_table=None):
+    """recommend_route 的快取版本；資料版本與正規化後的偏好相同時直接回傳先前的路線"""
+    key = (df.attrs.get('dataset_version'), preference_fingerprint(preferences), top_n, dist is None)
+
+    def build():
+        route = recommend_route(df, preferences, top_n, dist, anchor_table)
+        route.setflags(write=False)  # 快取內容由所有 session 共用
+        return route
+
+    return cache.get_or_create(key, build).copy()
+
+
+def calculate_walking_time(distance, speed_kmh=4.5):
+    """根據距離（公尺）計算步行時間，考慮不同步行速度"""
+    speed_ms = (speed_kmh * 1000) / 60  # 轉換為 m/min
+    walking_time = distance / speed_ms
+    return math.ceil(walking_time)
+
+
+def build_leg_table(df, route_idx, dist=None, speed_kmh=4.5):
+    """路線產生時一次算好每段路程：起訖列索引與座標、距離、步行分鐘與累計步行分鐘
+
+    路線面板與地圖路線都從這張表讀取，不再各自重算距離。
+    """
+    bars = df.iloc[list(route_idx)]
+    distances = route_distance_matrix(bars, dist)
+    lats = bars['geometry_location_lat'].to_numpy(dtype=float)
+    lngs = bars['geometry_location_lng'].to_numpy(dtype=float)
+
+    legs = []
+    cumulative = 0
+    for i in range(len(bars) - 1):
+        meters = float(distances[i, i + 1])
+        minutes = calculate_walking_time(meters, speed_kmh)
+        cumulative += minutes
+        legs.append({
+            'from_idx': int(route_idx[i]), 'to_idx': int(route_idx[i + 1]),
+            'from_lat': float(lats[i]), 'from_lng': float(lngs[i]),
+            'to_lat': float(lats[i + 1]), 'to_lng': float(lngs[i + 1]),
+            'meters': meters, 'minutes': minutes, 'cumulative_minutes': cumulative,
+        })
+    return legs
+
+
+def build_anchor_legs(df, route_idx, preferences, anchor_table=None, speed_kmh=4.5):
+    """起點錨點到第一站、最後一站到終點錨點的路段；未指定錨點的一端為 None"""
+    route_idx = list(route_idx)
+    legs = {'start': None, 'end': None}
+    if not route_idx:
+        return legs
+    for side, row in (('start', route_idx[0]), ('end', route_idx[-1])):
+        anchor = preferences.get(f'{side}_anchor')
+        if anchor is None:
+            continue
+        meters = float(anchor_distances(df, anchor, anchor_table)[df['bar_idx'].iat[row]])
+        lat, lng = anchor_location(anchor)
+        legs[side] = {
+            'name': anchor_label(anchor), 'bar_idx': int(row),
+            'lat': float(lat), 'lng': float(lng),
+            'meters': meters, 'minutes': calculate_walking_time(meters, speed_kmh),
+        }
+    return legs
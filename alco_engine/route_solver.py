@@ -0,0 +1,240 @@
+"""路線求解器 - 在預先計算的距離矩陣上求解固定起點（可選固定終點）的開放路徑
+
+所有求解器都接受可選的 penalty 矩陣：penalty[i, p] 為第 i 點排在第 p 站時額外加入的成本，
+用來表達「抵達時間不在營業時段內」等與站序相關的限制。
+"""
+import random
+import time
+
+import numpy as np
+
+EXACT_MAX_N = 12            # Held-Karp 精確解的站數上限
+DEFAULT_TIME_BUDGET = 0.05  # anytime 模式預設運算時間（秒）
+
+
+def route_length(dist, order):
+    """計算路線總長度"""
+    return float(sum(dist[a][b] for a, b in zip(order, order[1:])))
+
+
+def route_cost(dist, order, penalty=None):
+    """路線長度加上站序懲罰"""
+    cost = route_length(dist, order)
+    if penalty is not None:
+        cost += float(sum(penalty[node][pos] for pos, node in enumerate(order)))
+    return cost
+
+
+def solve_held_karp(dist, start=0, penalty=None):
+    """Held-Karp 動態規劃精確解（依子集大小分層向量化）"""
+    dist = np.asarray(dist, dtype=float)
+    n = len(dist)
+    if n <= 2:
+        return [start] + [i for i in range(n) if i != start]
+    if penalty is None:
+        penalty = np.zeros((n, n))
+    penalty = np.asarray(penalty, dtype=float)
+
+    size = 1 << n
+    dp = np.full((size, n), np.inf)
+    parent = np.full((size, n), -1, dtype=np.int64)
+    dp[1 << start, start] = penalty[start, 0]
+
+    masks = np.arange(size, dtype=np.int64)
+    popcounts = np.zeros(size, dtype=np.int64)
+    for k in range(n):
+        popcounts += (masks >> k) & 1
+    has_start = ((masks >> start) & 1).astype(bool)
+
+    for layer in range(1, n):
+        layer_masks = masks[(popcounts == layer) & has_start]
+        for k in range(n):
+            bit = 1 << k
+            sel = layer_masks[(layer_masks & bit) == 0]
+            if len(sel) == 0:
+                continue
+            candidates = dp[sel] + dist[:, k]
+            best_prev = candidates.argmin(axis=1)
+            # 新加入的點 k 位於第 layer 站
+            dp[sel | bit, k] = candidates[np.arange(len(sel)), best_prev] + penalty[k, layer]
+            parent[sel | bit, k] = best_prev
+
+    full = size - 1
+    last = int(dp[full].argmin())
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last)
+        prev = int(parent[mask, last])
+        mask ^= 1 << last
+        last = prev
+    return order[::-1]
+
+
+def nearest_neighbour(dist, start=0):
+    """最近鄰居法建立初始路線"""
+    n = len(dist)
+    order = [start]
+    remaining = set(range(n)) - {start}
+    while remaining:
+        current = order[-1]
+        nxt = min(remaining, key=lambda j: (dist[current][j], j))
+        order.append(nxt)
+        remaining.remove(nxt)
+    return order
+
+
+def two_opt(dist, order, penalty=None):
+    """2-opt 改善：反轉區段直到無法再縮短（起點固定、終點開放）"""
+    order = list(order)
+    n = len(order)
+    current = route_cost(dist, order, penalty)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            for j in range(i + 1, n):
+                c = order[j]
+                if penalty is None:
+                    delta = dist[a][c] - dist[a][b]
+                    if j < n - 1:
+                        d = order[j + 1]
+                        delta += dist[b][d] - dist[c][d]
+                else:
+                    # 反轉會改變站序，懲罰需整條重算
+                    candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    delta = route_cost(dist, candidate, penalty) - current
+                if delta < -1e-9:
+                    current += delta
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    a, b = order[i - 1], order[i]
+                    improved = True
+    return order
+
+
+def or_opt(dist, order, max_segment=3, penalty=None):
+    """Or-opt 改善：將長度 1~3 的區段（可反向）移到其他位置"""
+    order = list(order)
+    n = len(order)
+    current = route_cost(dist, order, penalty)
+    improved = True
+    while improved:
+        improved = False
+        for seg_len in range(1, max_segment + 1):
+            for i in range(1, n - seg_len + 1):
+                segment = order[i:i + seg_len]
+                prev = order[i - 1]
+                nxt = order[i + seg_len] if i + seg_len < n else None
+                removal = -dist[prev][segment[0]]
+                if nxt is not None:
+                    removal += dist[prev][nxt] - dist[segment[-1]][nxt]
+
+                rest = order[:i] + order[i + seg_len:]
+                best = (-1e-9, None, None)
+                for t in range(len(rest)):
+                    if t == i - 1:
+                        continue
+                    p = rest[t]
+                    q = rest[t + 1] if t + 1 < len(rest) else None
+                    for seg in (segment, segment[::-1]):
+                        if penalty is None:
+                            insertion = dist[p][seg[0]]
+                            if q is not None:
+                                insertion += dist[seg[-1]][q] - dist[p][q]
+                            delta = removal + insertion
+                        else:
+                            candidate = rest[:t + 1] + list(seg) + rest[t + 1:]
+                            delta = route_cost(dist, candidate, penalty) - current
+                        if delta < best[0]:
+                            best = (delta, t, seg)
+                if best[1] is not None:
+                    t, seg = best[1], best[2]
+                    order = rest[:t + 1] + list(seg) + rest[t + 1:]
+                    current += best[0]
+                    improved = True
+                    break
+            if improved:
+                break
+    return order
+
+
+def local_search(dist, order, penalty=None):
+    """交替執行 2-opt 與 Or-opt 直到收斂"""
+    best = route_cost(dist, order, penalty)
+    while True:
+        order = or_opt(dist, two_opt(dist, order, penalty), penalty=penalty)
+        cost = route_cost(dist, order, penalty)
+        if cost >= best - 1e-9:
+            return order
+        best = cost
+
+
+def _as_lists(dist, penalty):
+    """轉為巢狀 list，純 Python 迴圈存取較快"""
+    dist = np.asarray(dist, dtype=float).tolist()
+    if penalty is not None:
+        penalty = np.asarray(penalty, dtype=float).tolist()
+    return dist, penalty
+
+
+def solve_heuristic(dist, start=0, penalty=None):
+    """最近鄰居起始 + 2-opt / Or-opt 局部改善"""
+    dist, penalty = _as_lists(dist, penalty)
+    return local_search(dist, nearest_neighbour(dist, start), penalty)
+
+
+def solve_anytime(dist, start=0, penalty=None, time_budget=DEFAULT_TIME_BUDGET, seed=0):
+    """在時間預算內反覆擾動 + 局部改善，回傳目前找到的最佳路線"""
+    n = len(dist)
+    if n <= EXACT_MAX_N:
+        return solve_held_karp(dist, start, penalty)
+
+    deadline = time.perf_counter() + time_budget
+    dist, penalty = _as_lists(dist, penalty)
+    rng = random.Random(seed)
+    best = local_search(dist, nearest_neighbour(dist, start), penalty)
+    best_length = route_cost(dist, best, penalty)
+    while time.perf_counter() < deadline:
+        # double-bridge 擾動（不動起點）
+        cuts = sorted(rng.sample(range(1, n), 3))
+        a, b, c = cuts
+        candidate = best[:a] + best[b:c] + best[a:b] + best[c:]
+        candidate = local_search(dist, candidate, penalty)
+        length = route_cost(dist, candidate, penalty)
+        if length < best_length - 1e-9:
+            best, best_length = candidate, length
+    return best
+
+
+SOLVERS = {
+    'exact': solve_held_karp,
+    'heuristic': solve_heuristic,
+    'anytime': solve_anytime,
+}
+
+
+def solve_route(dist, mode='auto', start=0, penalty=None, end=None, **kwargs):
+    """依模式求解路線，回傳造訪順序（距離矩陣的索引列表）
+
+    end 不為 None 時終點固定為該點：先移除終點求解其餘各點，並把「最後一站到終點」的距離
+    當作最後一個站序的懲罰，因此各求解器不需修改即可處理固定終點。
+    """
+    n = len(dist)
+    if end is not None and end != start and n > 2:
+        dist = np.asarray(dist, dtype=float)
+        keep = [i for i in range(n) if i != end]
+        m = len(keep)
+        sub_penalty = np.zeros((m, m))
+        sub_penalty[:, m - 1] = dist[keep, end]
+        if penalty is not None:
+            sub_penalty += np.asarray(penalty, dtype=float)[np.ix_(keep, range(m))]
+        order = solve_route(dist[np.ix_(keep, keep)], mode, keep.index(start), sub_penalty, **kwargs)
+        return [keep[i] for i in order] + [end]
+    if n <= 2:
+        return [start] + [i for i in range(n) if i != start]
+    if mode == 'auto':
+        mode = 'exact' if n <= EXACT_MAX_N else 'heuristic'
+    if mode not in SOLVERS:
+        raise ValueError(f"未知的路線求解模式: {mode}")
+    return SOLVERS[mode](dist, start=start, penalty=penalty, **kwargs)
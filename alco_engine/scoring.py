@@ -0,0 +1,320 @@
+"""推薦分數計算 - 單列參考實作、向量化版本與多組偏好的批次版本（結果完全一致）"""
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from .liquor import LIQUORS, extract_liquors, liquor_masks
+
+# 勾選式偏好：(偏好鍵, 遮罩欄位, 詞彙表, 權重)，權重與 calculate_advanced_score 相同
+SELECTION_FIELDS = [('bar_styles', 'style_mask', 'style_vocab', 0.25),
+                    ('music_types', 'music_mask', 'music_vocab', 0.20)]
+# 基酒偏好：有勾選（或「沒有偏好」）時，其他項目合計縮放為 LIQUOR_SCALE，總權重維持 1
+LIQUOR_FIELD = ('liquors', 'liquor_mask', 'liquor_vocab', 0.10)
+LIQUOR_SCALE = 0.9
+# 批次評分時每次處理的偏好組數，限制 profiles×bars 暫存陣列的大小
+BATCH_PROFILE_CHUNK = 64
+# 價位字串：'300-800'、'1500~3000'、'3000+'、'3000以上'、'500'
+PRICE_BAND_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:[-~～–]\s*(\d+(?:\.\d+)?)|(\+|以上))?\s*$')
+
+
+def parse_price_band(value, price_level=None):
+    """將 price_level_monetary 解析為 (最低, 最高) 價格
+
+    '未提供'、'N/A' 或缺失時以 price_level * 400 作為單一價格；price_level 也缺失或為 0 時回傳 (nan, nan)。
+    """
+    match = PRICE_BAND_PATTERN.match(value) if isinstance(value, str) else None
+    if match:
+        low = float(match.group(1))
+        if match.group(2):
+            high = float(match.group(2))
+        elif match.group(3):
+            high = math.inf
+        else:
+            high = low
+        return (low, high) if low <= high else (high, low)
+    if price_level is not None and pd.notna(price_level) and price_level > 0:
+        estimate = price_level * 400
+        return estimate, estimate
+    return math.nan, math.nan
+
+
+def price_band_score(low, high, price_target):
+    """單間預算落在價位區間內為 1，區間外每差 600 元線性扣到 0；可直接用於 NumPy 陣列"""
+    price_diff = np.maximum(low - price_target, 0) + np.maximum(price_target - high, 0)
+    return np.maximum(0, 1 - (price_diff / 600))
+
+
+def estimated_spend(df):
+    """每間酒吧的預估花費：價位區間中點（無上限時取下限），價位不明時為 0"""
+    low = df['price_low'].to_numpy()
+    high = df['price_high'].to_numpy()
+    spend = np.where(np.isinf(high), low, (low + high) / 2)
+    return np.nan_to_num(spend, nan=0.0)
+
+
+def within_budget(spend, budget):
+    """依造訪順序累加花費，回傳不超過整晚預算的前幾站數量；budget 為 None 時不限制"""
+    if budget is None:
+        return len(spend)
+    return int(np.searchsorted(np.cumsum(spend), budget, side='right'))
+
+
+def build_score_features(df):
+    """預先計算向量化評分所需的欄位（價位區間、標準化評分、熱門度、風格/音樂/基酒遮罩）"""
+    df = df.copy()
+
+    # 價位區間：每種價位字串只解析一次；無法解析時以 price_level 估算，皆缺失時為 NaN（不計價格分數）
+    codes, values = pd.factorize(df['price_level_monetary'])
+    parsed = np.array([parse_price_band(v) for v in values] + [(math.nan, math.nan)], dtype=float).reshape(-1, 2)
+    low, high = parsed[codes, 0], parsed[codes, 1]  # codes 為 -1（缺失）時取到最後一列的 NaN
+    price_level = df['price_level'].to_numpy(dtype=float)
+    estimate = np.where(price_level > 0, price_level * 400, np.nan)
+    unparsed = np.isnan(low)
+    df['price_low'] = np.where(unparsed, estimate, low)
+    df['price_high'] = np.where(unparsed, estimate, high)
+
+    # 評分標準化 1-5 → 0-1，無評分時為 0
+    rating = df['rating'].to_numpy(dtype=float)
+    df['rating_normalized'] = np.where(rating > 0, (rating - 1) / 4, 0.0)
+
+    # 熱門度：使用 math.log 逐值計算一次，確保與單列評分結果完全一致
+    df['popularity_score'] = [
+        min(1.0, math.log(total + 1) / 10) if pd.notna(total) and total > 0 else 0.0
+        for total in df['user_ratings_total']
+    ]
+
+    # 風格/音樂標籤只切分一次，編碼成 uint64 位元遮罩，詞彙表存於 df.attrs
+    for col, mask_col, vocab_key in [('bar_style', 'style_mask', 'style_vocab'),
+                                     ('music_type', 'music_mask', 'music_vocab')]:
+        tokens = [
+            [t.strip() for t in str(value).split(', ')] if value != 'N/A' else []
+            for value in df[col]
+        ]
+        vocab = sorted({t for row in tokens for t in row})
+        if len(vocab) > 64:
+            raise ValueError(f"{col} 標籤種類超過 64 種，無法編碼為 uint64 遮罩")
+        bit_of = {t: np.uint64(1) << np.uint64(i) for i, t in enumerate(vocab)}
+        masks = np.zeros(len(df), dtype=np.uint64)
+        for i, row in enumerate(tokens):
+            for t in row:
+                masks[i] |= bit_of[t]
+        df[mask_col] = masks
+        df.attrs[vocab_key] = vocab
+
+    # 基酒：酒單中的酒款與材料只解析一次，詞彙表固定為 LIQUORS
+    df['liquor_mask'] = liquor_masks(df['top_3_selection'])
+    df.attrs['liquor_vocab'] = list(LIQUORS)
+
+    return df
+
+
+def encode_selection(selected, vocab):
+    """將使用者選擇的標籤轉為位元遮罩（不在詞彙表中的標籤不會被匹配）"""
+    mask = np.uint64(0)
+    for item in selected:
+        if item in vocab:
+            mask |= np.uint64(1) << np.uint64(vocab.index(item))
+    return mask
+
+
+def decode_mask(mask, vocab):
+    """將位元遮罩還原為標籤列表"""
+    mask = int(mask)
+    return [t for i, t in enumerate(vocab) if mask >> i & 1]
+
+
+def popcount(masks):
+    """計算每個 uint64 遮罩中 1 的個數"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int64)
+    # NumPy < 2.0：逐位元組查表
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+    return table[masks.reshape(-1, 1).view(np.uint8)].sum(axis=1).reshape(masks.shape)
+
+
+def calculate_advanced_score(bar, preferences):
+    """進階推薦算法"""
+    score = 0
+    max_score = 1.0
+
+    # 價格匹配 (35% 權重)
+    price_target = preferences.get('price_point', 500)
+    price_low, price_high = parse_price_band(bar['price_level_monetary'], bar['price_level'])
+    if not math.isnan(price_low):
+        # 預算落在價位區間內為滿分，區間外 600 元內差異可接受
+        price_diff = max(price_low - price_target, 0) + max(price_target - price_high, 0)
+        price_score = max(0, 1 - (price_diff / 600))
+        score += price_score * 0.35
+
+    # 風格匹配 (25% 權重)
+    bar_styles_pref = preferences.get('bar_styles', {})
+
+    # 檢查是否選擇了「沒有偏好」
+    if bar_styles_pref.get('沒有偏好', False):
+        # 如果選擇了「沒有偏好」，給予滿分
+        score += 0.25
+    else:
+        # 正常風格匹配邏輯
+        selected_styles = [k for k, v in bar_styles_pref.items() if v and k != '沒有偏好']
+        if selected_styles and bar['bar_style'] != 'N/A':
+            bar_styles = str(bar['bar_style']).split(', ')
+            style_matches = sum(1 for style in selected_styles if any(s.strip() == style for s in bar_styles))
+            if style_matches > 0:
+                score += (style_matches / len(selected_styles)) * 0.25
+
+    # 音樂匹配 (20% 權重)
+    music_types_pref = preferences.get('music_types', {})
+
+    # 檢查是否選擇了「沒有偏好」
+    if music_types_pref.get('沒有偏好', False):
+        # 如果選擇了「沒有偏好」，給予滿分
+        score += 0.20
+    else:
+        # 正常音樂匹配邏輯
+        selected_music = [k for k, v in music_types_pref.items() if v and k != '沒有偏好']
+        if selected_music and bar['music_type'] != 'N/A':
+            music_types = str(bar['music_type']).split(', ')
+            music_matches = sum(1 for music in selected_music if any(m.strip() == music for m in music_types))
+            if music_matches > 0:
+                score += (music_matches / len(selected_music)) * 0.20
+
+    # 評分加成 (15% 權重)
+    if pd.notna(bar['rating']) and bar['rating'] > 0:
+        rating_normalized = (bar['rating'] - 1) / 4  # 1-5 標準化到 0-1
+        score += rating_normalized * 0.15
+
+    # 熱門度加成 (5% 權重)
+    if pd.notna(bar['user_ratings_total']) and bar['user_ratings_total'] > 0:
+        popularity_score = min(1.0, math.log(bar['user_ratings_total'] + 1) / 10)
+        score += popularity_score * 0.05
+
+    # 基酒匹配 (10% 權重)：有基酒偏好時，以上各項縮放為 90%
+    liquors_pref = preferences.get('liquors', {})
+    selected_liquors = [k for k, v in liquors_pref.items() if v and k != '沒有偏好']
+    if liquors_pref.get('沒有偏好', False):
+        score = score * 0.9 + 0.10
+    elif selected_liquors:
+        liquor_score = 0
+        if bar['top_3_selection'] != 'N/A':
+            bar_liquors = extract_liquors(bar['top_3_selection'])
+            liquor_matches = sum(1 for liquor in selected_liquors if liquor in bar_liquors)
+            if liquor_matches > 0:
+                liquor_score = (liquor_matches / len(selected_liquors)) * 0.10
+        score = score * 0.9 + liquor_score
+
+    return min(score, max_score)
+
+
+def calculate_scores(df, preferences):
+    """向量化推薦算法 - 一次計算整個資料集，結果與 calculate_advanced_score 相同"""
+    score = np.zeros(len(df))
+
+    # 價格匹配 (35% 權重)
+    price_target = preferences.get('price_point', 500)
+    price_low = df['price_low'].to_numpy()
+    price_score = price_band_score(price_low, df['price_high'].to_numpy(), price_target)
+    score += np.where(np.isnan(price_low), 0.0, price_score * 0.35)
+
+    # 風格匹配 (25% 權重) 與 音樂匹配 (20% 權重)
+    for pref_key, mask_col, vocab_key, weight in SELECTION_FIELDS:
+        pref = preferences.get(pref_key, {})
+        if pref.get('沒有偏好', False):
+            score += weight
+            continue
+        selected = [k for k, v in pref.items() if v and k != '沒有偏好']
+        if selected:
+            selection_mask = encode_selection(selected, df.attrs[vocab_key])
+            matches = popcount(df[mask_col].to_numpy() & selection_mask)
+            score += np.where(matches > 0, (matches / len(selected)) * weight, 0.0)
+
+    # 評分加成 (15% 權重)
+    score += df['rating_normalized'].to_numpy() * 0.15
+
+    # 熱門度加成 (5% 權重)
+    score += df['popularity_score'].to_numpy() * 0.05
+
+    # 基酒匹配 (10% 權重)：有基酒偏好時，以上各項縮放為 90%
+    pref_key, mask_col, vocab_key, weight = LIQUOR_FIELD
+    pref = preferences.get(pref_key, {})
+    selected = [k for k, v in pref.items() if v and k != '沒有偏好']
+    if pref.get('沒有偏好', False):
+        score = score * LIQUOR_SCALE + weight
+    elif selected:
+        selection_mask = encode_selection(selected, df.attrs[vocab_key])
+        matches = popcount(df[mask_col].to_numpy() & selection_mask)
+        score = score * LIQUOR_SCALE + np.where(matches > 0, (matches / len(selected)) * weight, 0.0)
+
+    return np.minimum(score, 1.0)
+
+
+def encode_profiles(df, profiles):
+    """將多組偏好編碼為向量：price_point (P,)，以及每個勾選式偏好的
+    <鍵>_mask (P,) uint64、<鍵>_count (P,) 勾選數、<鍵>_any (P,)「沒有偏好」旗標
+    """
+    encoded = {'price_point': np.array([p.get('price_point', 500) for p in profiles], dtype=float)}
+    for pref_key, _, vocab_key, _ in SELECTION_FIELDS + [LIQUOR_FIELD]:
+        vocab = df.attrs[vocab_key]
+        masks, counts, any_flags = [], [], []
+        for p in profiles:
+            pref = p.get(pref_key, {})
+            selected = [k for k, v in pref.items() if v and k != '沒有偏好']
+            masks.append(encode_selection(selected, vocab))
+            counts.append(len(selected))
+            any_flags.append(bool(pref.get('沒有偏好', False)))
+        encoded[f'{pref_key}_mask'] = np.array(masks, dtype=np.uint64)
+        encoded[f'{pref_key}_count'] = np.array(counts, dtype=np.int64)
+        encoded[f'{pref_key}_any'] = np.array(any_flags, dtype=bool)
+    return encoded
+
+
+def calculate_scores_batch(df, profiles, chunk_size=BATCH_PROFILE_CHUNK):
+    """一次為多組偏好評分，回傳 profiles×bars 分數矩陣；每一列與 calculate_scores 完全相同
+
+    profiles 可為偏好 dict 的列表，或 encode_profiles 的結果（重複評分時可先編碼一次）。
+    """
+    encoded = profiles if isinstance(profiles, dict) else encode_profiles(df, profiles)
+    n_profiles = len(encoded['price_point'])
+    scores = np.empty((n_profiles, len(df)))
+
+    # 價位與風格/音樂/基酒遮罩的種類遠少於酒吧數：先對每種取值算分，再以索引展開到每間酒吧
+    bands = np.column_stack([df['price_low'].to_numpy(), df['price_high'].to_numpy()])
+    price_values, price_code = np.unique(np.nan_to_num(bands, nan=-1.0), axis=0, return_inverse=True)
+    price_code = price_code.reshape(-1)
+    price_known = price_values[:, 0] >= 0  # 價格不為負，-1 代表缺失
+    mask_values = {}
+    for _, mask_col, _, _ in SELECTION_FIELDS + [LIQUOR_FIELD]:
+        mask_values[mask_col] = np.unique(df[mask_col].to_numpy(), return_inverse=True)
+    rating_part = df['rating_normalized'].to_numpy() * 0.15
+    popularity_part = df['popularity_score'].to_numpy() * 0.05
+
+    for start in range(0, n_profiles, chunk_size):
+        rows = slice(start, start + chunk_size)
+        # 加總順序與 calculate_scores 相同，確保浮點結果逐位元一致
+        price_target = encoded['price_point'][rows, None]
+        price_score = price_band_score(price_values[:, 0], price_values[:, 1], price_target)
+        score = np.where(price_known, price_score * 0.35, 0.0)[:, price_code]
+
+        def selection_part(pref_key, mask_col, weight):
+            values, code = mask_values[mask_col]
+            any_flag = encoded[f'{pref_key}_any'][rows, None]
+            count = encoded[f'{pref_key}_count'][rows, None]
+            matches = popcount(values & encoded[f'{pref_key}_mask'][rows, None])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                partial = np.where(matches > 0, (matches / count) * weight, 0.0)
+            active = any_flag | (count > 0)
+            return np.where(any_flag, weight, np.where(count > 0, partial, 0.0))[:, code], active
+
+        for pref_key, mask_col, _, weight in SELECTION_FIELDS:
+            score += selection_part(pref_key, mask_col, weight)[0]
+
+        score += rating_part
+        score += popularity_part
+
+        pref_key, mask_col, _, weight = LIQUOR_FIELD
+        liquor_part, active = selection_part(pref_key, mask_col, weight)
+        score = np.where(active, score * LIQUOR_SCALE + liquor_part, score)
+        scores[rows] = np.minimum(score, 1.0)
+    return scores
@@ -0,0 +1,221 @@
+"""合成酒吧資料 - 產生與 all_info_0522.csv 相同欄位、任意規模的信義區酒吧目錄
+
+座標以數個熱門商圈為中心成群分布，風格、音樂、價位、評分與營業時間的組合都仿照實際資料。
+同一個 (n_bars, seed) 一定產生相同的資料，基準測試可重現。
+
+產生 CSV：python -m alco_engine.synthetic 10000 --seed 1 -o synthetic_10k.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .catalogue import prepare_catalogue
+from .opening_hours import WEEKDAYS
+
+# 與 all_info_0522.csv 相同的欄位順序
+COLUMNS = [
+    'final_name', 'place_id', 'formatted_phone_number', 'rating', 'user_ratings_total',
+    'price_level', 'price_level_monetary', 'bar_style', 'env_type', 'music_type',
+    'top_3_selection', 'original_url', 'types', 'vicinity', 'website',
+    'opening_hours_weekday_text', 'geometry_location_lat', 'geometry_location_lng',
+    'geometry_viewport_northeast_lat', 'geometry_viewport_northeast_lng',
+    'geometry_viewport_southwest_lat', 'geometry_viewport_southwest_lng',
+]
+
+# 信義區範圍（超出的點會被夾回範圍內）
+XINYI_VIEWPORT = {'south': 25.024, 'north': 25.052, 'west': 121.548, 'east': 121.578}
+# 酒吧聚集的商圈：(緯度, 經度, 權重, 分布半徑公尺)
+HOTSPOTS = [
+    (25.0408, 121.5652, 0.25, 250),   # 市政府站 / 新光三越
+    (25.0360, 121.5670, 0.20, 300),   # 松壽路 / ATT 4 FUN
+    (25.0340, 121.5645, 0.15, 250),   # 台北101 / 世貿
+    (25.0330, 121.5705, 0.10, 200),   # 象山站
+    (25.0440, 121.5600, 0.10, 300),   # 松菸 / 光復南路
+    (25.0410, 121.5765, 0.08, 250),   # 永春站
+    (25.0380, 121.5540, 0.07, 300),   # 國父紀念館 / 東區
+    (25.0380, 121.5650, 0.05, 1200),  # 區內零星分布
+]
+METERS_PER_DEG_LAT = 111_320
+VIEWPORT_HALF_DEG = 0.00135
+
+# 主風格 → (可搭配的第二風格, 常見音樂組合, 場地類型權重 [室內, 室外, 兩者])
+STYLE_PROFILES = {
+    '夜店型酒吧': (['立飲酒吧'], ['Pop, Hip-Hop, EDM', 'Pop, Hip-Hop', 'Hip-Hop, EDM', 'Pop, EDM'], [0.2, 0.1, 0.7]),
+    '精緻酒吧': (['餐酒館', '觀景酒吧', '茶酒酒吧', '啤酒專門酒吧'],
+                 ['Lo-fi, Chillhop, Jazz', 'Low-key Electronic, Jazz', 'Jazz', 'Lo-fi, Chillhop'], [0.7, 0.05, 0.25]),
+    '餐酒館': (['精緻酒吧', '音樂酒吧', '威士忌酒吧'], ['Pop, Jazz', 'Jazz', 'R&B, Lo-fi, Chillhop', 'EDM'], [0.5, 0.1, 0.4]),
+    '音樂酒吧': (['餐酒館', '英式酒館'], ['Jazz, Rock', 'Pop, Jazz', 'Pop, Hip-Hop', 'Hip-Hop, EDM, Jazz'], [0.5, 0.05, 0.45]),
+    '立飲酒吧': (['夜店型酒吧', '啤酒專門酒吧'], ['多元風格', 'Pop, Hip-Hop'], [0.3, 0.3, 0.4]),
+    '威士忌酒吧': (['餐酒館', '精緻酒吧'], ['Jazz, Lo-fi, Chillhop, Low-key Electronic', 'Jazz'], [0.8, 0.0, 0.2]),
+    '啤酒專門酒吧': (['英式酒館', '精緻酒吧'], ['Pop, Hip-Hop, EDM', 'Lo-fi, Chillhop, Jazz', '多元風格'], [0.4, 0.2, 0.4]),
+    '咖啡餐酒館': (['精緻酒吧'], ['Lo-Fi Chill, Low-key Electronic, Jazz'], [0.4, 0.1, 0.5]),
+    '觀景酒吧': (['精緻酒吧'], ['Lo-Fi Chill, Low-key Electronic, Jazz'], [0.3, 0.2, 0.5]),
+}
+STYLE_WEIGHTS = {
+    '夜店型酒吧': 0.16, '精緻酒吧': 0.24, '餐酒館': 0.20, '音樂酒吧': 0.12, '立飲酒吧': 0.08,
+    '威士忌酒吧': 0.06, '啤酒專門酒吧': 0.06, '咖啡餐酒館': 0.04, '觀景酒吧': 0.04,
+}
+SECOND_STYLE_PROB = 0.5
+
+# 價位等級 0 表示 Google 未提供
+PRICE_LEVEL_WEIGHTS = {0: 0.45, 1: 0.04, 2: 0.36, 3: 0.12, 4: 0.03}
+PRICE_MONETARY = {0: '未提供', 1: '100-300', 2: '300-800', 3: '800-1500', 4: '1500-3000'}
+
+TYPES_OPTIONS = [
+    ('bar; point_of_interest; establishment', 0.45),
+    ('restaurant; bar; food; point_of_interest; establishment', 0.2),
+    ('restaurant; food; point_of_interest; establishment', 0.12),
+    ('night_club; bar; point_of_interest; establishment', 0.08),
+    ('bar; cafe; restaurant; point_of_interest; food; establishment', 0.06),
+    ('cafe; store; bar; food; point_of_interest; establishment', 0.05),
+    ('liquor_store; bar; food; point_of_interest; store; establishment', 0.04),
+]
+
+# 招牌調酒：名稱（材料）
+DRINKS = [
+    '港式凍檸烏龍（伏特加、烏龍茶、梅子、桂花、山楂）', '飛天小女警（萊姆酒、茉莉花、梅酒、水蜜桃、百香果）',
+    '中國娃娃（伏特加、烏龍、荔枝）', 'SOUR SOUR WHISKY（杏桃、百香果、威士忌、香艾酒）',
+    'AFTERNOON TEA PUNCH（琴酒、黑蘭姆酒、伯爵茶、糖、萊姆）', '台虎 IPA（美式酒花、柑橘、杏桃、芒果、百香果）',
+    '魔藥學（桂圓鐵觀音、梅酒）', '夏夜晚風（泰式奶茶、奶酒）', 'Negroni（琴酒、金巴利、甜香艾酒）',
+    'Old Fashioned（波本威士忌、苦精、方糖）', 'Margarita（龍舌蘭、君度橙酒、萊姆汁）', 'Mojito（白蘭姆酒、薄荷、萊姆、蘇打水）',
+    '信義夜色（琴酒、蝶豆花、檸檬、通寧水）', '東方美人（東方美人茶、琴酒、水蜜桃）', 'Highball（日本威士忌、蘇打水）',
+    '精釀小麥啤酒', '松仁路微醺麻雀（蘆筍、桂花、白葡萄、琴酒）', '芭樂鹽小麥（芭樂、精釀啤酒、甘梅粉）',
+    'Espresso Martini（伏特加、咖啡利口酒、濃縮咖啡）', '梅酒蘇打（梅酒、蘇打水、紫蘇）',
+]
+
+NAME_PREFIXES = ['Moon', 'Velvet', 'Hidden', 'Neon', 'Amber', 'Copper', 'Lucky', 'Midnight', 'Urban', 'Golden',
+                 'Blue', 'Quiet', 'Sober', 'Tiger', 'Jade', 'Echo']
+NAME_SUFFIXES = ['Bar', 'Lounge', 'Taproom', 'Tavern', 'Bistro', 'Club', 'Room', 'House', 'Cellar', 'Den']
+STREETS = ['松壽路', '松高路', '松仁路', '松智路', '忠孝東路五段', '基隆路一段', '光復南路', '市民大道六段',
+           '信義路五段', '永吉路', '松山路', '逸仙路']
+
+# 營業時間：開店時刻與打烊時刻（平日 / 週五六）
+OPEN_TIMES = ['12:00', '15:00', '17:00', '18:00', '19:00', '20:00', '21:00']
+OPEN_WEIGHTS = [0.05, 0.08, 0.2, 0.3, 0.17, 0.12, 0.08]
+CLOSE_TIMES = ['23:30', '00:00', '01:00', '01:30', '02:00', '02:30', '03:00', '04:00']
+CLOSE_WEIGHTS = [0.05, 0.15, 0.25, 0.1, 0.2, 0.08, 0.12, 0.05]
+WEEKEND_EXTENSION = 2  # 週五六打烊時間延後的檔位數
+CLOSED_DAY_PROB = 0.3   # 每週固定公休一天的機率（多為星期一）
+MISSING_HOURS_PROB = 0.03
+
+
+def _weighted_choice(rng, options, weights, size):
+    """依權重抽樣，回傳 options 中的元素陣列"""
+    p = np.asarray(weights, dtype=float)
+    return np.asarray(options, dtype=object)[rng.choice(len(options), size=size, p=p / p.sum())]
+
+
+def _opening_hours_text(open_idx, close_idx, closed_day):
+    """組出 Google 格式的營業時間字串，例如「星期一: 18:00 – 02:00; ...」"""
+    parts = []
+    for day, name in enumerate(WEEKDAYS):
+        if day == closed_day:
+            parts.append(f'{name}: 休息')
+            continue
+        close = close_idx + (WEEKEND_EXTENSION if day in (4, 5) else 0)
+        close_time = CLOSE_TIMES[min(close, len(CLOSE_TIMES) - 1)]
+        parts.append(f'{name}: {OPEN_TIMES[open_idx]} – {close_time}')
+    return '; '.join(parts)
+
+
+def generate_catalogue(n_bars, seed=0):
+    """產生 n_bars 間酒吧的原始資料（欄位與 CSV 相同，尚未經 prepare_catalogue 處理）"""
+    rng = np.random.default_rng(seed)
+
+    # 座標：先抽商圈，再以常態分布散開
+    centres = np.asarray([h[:2] for h in HOTSPOTS])
+    spreads = np.asarray([h[3] for h in HOTSPOTS], dtype=float)
+    weights = np.asarray([h[2] for h in HOTSPOTS])
+    hotspot = rng.choice(len(HOTSPOTS), size=n_bars, p=weights / weights.sum())
+    lat = centres[hotspot, 0] + rng.normal(0, 1, n_bars) * spreads[hotspot] / METERS_PER_DEG_LAT
+    lng = centres[hotspot, 1] + rng.normal(0, 1, n_bars) * spreads[hotspot] / (
+        METERS_PER_DEG_LAT * np.cos(np.radians(centres[hotspot, 0]))
+    )
+    lat = np.clip(lat, XINYI_VIEWPORT['south'], XINYI_VIEWPORT['north'])
+    lng = np.clip(lng, XINYI_VIEWPORT['west'], XINYI_VIEWPORT['east'])
+
+    # 風格與對應的音樂、場地類型
+    primary = _weighted_choice(rng, list(STYLE_WEIGHTS), list(STYLE_WEIGHTS.values()), n_bars)
+    has_second = rng.random(n_bars) < SECOND_STYLE_PROB
+    bar_style = primary.copy()
+    music_type = np.empty(n_bars, dtype=object)
+    env_type = np.empty(n_bars, dtype=int)
+    for style, (seconds, musics, env_weights) in STYLE_PROFILES.items():
+        rows = np.flatnonzero(primary == style)
+        paired = rows[has_second[rows]]
+        second = _weighted_choice(rng, seconds, [1] * len(seconds), len(paired))
+        bar_style[paired] = [f'{style}, {s}' for s in second]
+        music_type[rows] = _weighted_choice(rng, musics, [1] * len(musics), len(rows))
+        env_type[rows] = rng.choice(3, size=len(rows), p=env_weights)
+
+    price_level = _weighted_choice(rng, list(PRICE_LEVEL_WEIGHTS), list(PRICE_LEVEL_WEIGHTS.values()), n_bars)
+    rating = np.round(np.clip(rng.normal(4.5, 0.25, n_bars), 3.5, 5.0), 1)
+    user_ratings_total = np.maximum(rng.lognormal(6.0, 1.0, n_bars).astype(int), 5)
+
+    # 營業時間：週五六延後打烊，部分店家固定公休
+    open_idx = rng.choice(len(OPEN_TIMES), size=n_bars, p=OPEN_WEIGHTS)
+    close_idx = rng.choice(len(CLOSE_TIMES), size=n_bars, p=CLOSE_WEIGHTS)
+    closed_day = np.where(rng.random(n_bars) < CLOSED_DAY_PROB, rng.choice([0, 0, 0, 1, 6], size=n_bars), -1)
+    missing_hours = rng.random(n_bars) < MISSING_HOURS_PROB
+    hours_text = {}
+    hours = [
+        None if missing else hours_text.setdefault(key, _opening_hours_text(*key))
+        for missing, key in zip(missing_hours, zip(open_idx, close_idx, closed_day))
+    ]
+
+    # 每間酒吧 1～3 杯不重複的招牌調酒
+    n_drinks = rng.integers(1, 4, n_bars)
+    drink_order = np.argsort(rng.random((n_bars, len(DRINKS))), axis=1)[:, :3]
+    top_3 = [', '.join(DRINKS[d] for d in order[:k]) for order, k in zip(drink_order, n_drinks)]
+    prefix = rng.integers(len(NAME_PREFIXES), size=n_bars)
+    suffix = rng.integers(len(NAME_SUFFIXES), size=n_bars)
+    street = rng.integers(len(STREETS), size=n_bars)
+    number = rng.integers(1, 300, n_bars)
+    phone = rng.integers(0, 10_000, (n_bars, 2))
+    has_phone = rng.random(n_bars) < 0.8
+
+    df = pd.DataFrame({
+        'final_name': [f'{NAME_PREFIXES[p]} {NAME_SUFFIXES[s]} {i:05d}' for i, (p, s) in enumerate(zip(prefix, suffix))],
+        'place_id': [f'SYN{seed}-{i:07d}' for i in range(n_bars)],
+        'formatted_phone_number': [
+            f'02 27{a // 100:02d} {b:04d}' if ok else '未提供' for (a, b), ok in zip(phone, has_phone)
+        ],
+        'rating': rating,
+        'user_ratings_total': user_ratings_total,
+        'price_level': price_level.astype(float),
+        'price_level_monetary': [PRICE_MONETARY[p] for p in price_level],
+        'bar_style': bar_style,
+        'env_type': env_type,
+        'music_type': music_type,
+        'top_3_selection': top_3,
+        'original_url': [f'https://maps.app.goo.gl/synthetic-{seed}-{i}' for i in range(n_bars)],
+        'types': _weighted_choice(rng, [t for t, _ in TYPES_OPTIONS], [w for _, w in TYPES_OPTIONS], n_bars),
+        'vicinity': [f'信義區{STREETS[s]}{n}號' for s, n in zip(street, number)],
+        'website': '未提供',
+        'opening_hours_weekday_text': hours,
+        'geometry_location_lat': lat,
+        'geometry_location_lng': lng,
+        'geometry_viewport_northeast_lat': lat + VIEWPORT_HALF_DEG,
+        'geometry_viewport_northeast_lng': lng + VIEWPORT_HALF_DEG,
+        'geometry_viewport_southwest_lat': lat - VIEWPORT_HALF_DEG,
+        'geometry_viewport_southwest_lng': lng - VIEWPORT_HALF_DEG,
+    })
+    return df[COLUMNS]
+
+
+def synthetic_catalogue(n_bars, seed=0):
+    """產生並預處理合成資料，可直接傳給推薦函式"""
+    return prepare_catalogue(generate_catalogue(n_bars, seed), f'synthetic-{n_bars}-{seed}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='產生合成的信義區酒吧資料')
+    parser.add_argument('n_bars', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='輸出 CSV 路徑（預設 synthetic_<n>_<seed>.csv）')
+    args = parser.parse_args()
+
+    output = args.output or f'synthetic_{args.n_bars}_{args.seed}.csv'
+    generate_catalogue(args.n_bars, args.seed).to_csv(output, index=False)
+    print(f'✅ {args.n_bars} 間酒吧 → {output}')
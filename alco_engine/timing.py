@@ -0,0 +1,90 @@
+"""階段計時 - 量測推薦流程各階段耗時，寫入 JSONL 並統計 p50/p95
+
+引擎與 app 在各階段以 `with stage('score'):` 包住；沒有啟用計時器時 stage() 回傳共用的空 context，
+幾乎不增加成本。啟用方式是在每次執行開始時呼叫 activate_timer(timer)，
+計時器只對目前的執行緒 / context 生效，各 Streamlit session 互不干擾。
+"""
+import contextlib
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+# 每個階段保留的最近樣本數
+MAX_SAMPLES = 500
+
+_active_timer = contextvars.ContextVar('alco_stage_timer', default=None)
+_NULL_STAGE = contextlib.nullcontext()
+_log_lock = threading.Lock()
+
+
+class StageTimer:
+    """收集各階段耗時；log_path 不為 None 時每筆同時附加到 JSONL 檔"""
+
+    def __init__(self, log_path=None, max_samples=MAX_SAMPLES):
+        self.log_path = log_path
+        self.session_id = uuid.uuid4().hex[:8]
+        self._max_samples = max_samples
+        self._samples = {}
+
+    def record(self, name, seconds, **fields):
+        """記錄一筆階段耗時"""
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self._max_samples)
+        samples.append(seconds)
+        if self.log_path:
+            entry = {'ts': time.time(), 'session': self.session_id, 'stage': name,
+                     'ms': round(seconds * 1000, 3), **fields}
+            with _log_lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def summary(self):
+        """各階段的次數、p50、p95 與最近一次耗時（毫秒），依第一次出現的順序"""
+        result = {}
+        for name, samples in self._samples.items():
+            ms = np.asarray(samples) * 1000
+            p50, p95 = np.percentile(ms, [50, 95])
+            result[name] = {'count': len(ms), 'p50_ms': round(float(p50), 2),
+                            'p95_ms': round(float(p95), 2), 'last_ms': round(float(ms[-1]), 2)}
+        return result
+
+    def clear(self):
+        self._samples.clear()
+
+
+class _Stage:
+    """量測 with 區塊耗時並回報給計時器"""
+    __slots__ = ('timer', 'name', 'fields', 'start')
+
+    def __init__(self, timer, name, fields):
+        self.timer, self.name, self.fields = timer, name, fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start, **self.fields)
+        return False
+
+
+def activate_timer(timer):
+    """設定目前 context 的計時器（None 表示停用）"""
+    _active_timer.set(timer)
+
+
+def active_timer():
+    return _active_timer.get()
+
+
+def stage(name, **fields):
+    """階段計時的 context manager；未啟用時不做任何事"""
+    timer = _active_timer.get()
+    if timer is None:
+        return _NULL_STAGE
+    return _Stage(timer, name, fields)
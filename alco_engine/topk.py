@@ -0,0 +1,61 @@
+"""Top-k 選擇 - 以 np.argpartition 從分數陣列挑出前 k 名，排序與 Series.nlargest(k) 相同
+
+只在分數陣列上運作，不需要把分數寫回 DataFrame；也可以逐片（shard）串流處理放不進單一資料表的目錄：
+
+    best = streaming_top_k(
+        ((calculate_scores(shard, preferences), shard['place_id'].to_numpy()) for shard in shards), k=12
+    )
+"""
+import numpy as np
+
+
+def _top_k_positions(scores, order, k):
+    """分數最高的 k 個位置；同分時 order 較小者優先，結果依 (分數遞減, order 遞增) 排序"""
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        # 第 k 大的分數；高於它的全部入選，等於它的依 order 補滿 k 個
+        part = np.argpartition(scores, n - k)
+        kth = scores[part[n - k]]
+        tail = part[n - k:]
+        above = tail[scores[tail] > kth]
+        ties = np.flatnonzero(scores == kth)
+        ties = ties[np.argsort(order[ties], kind='stable')][:k - len(above)]
+        selected = np.concatenate([above, ties])
+    else:
+        selected = np.arange(n)
+    return selected[np.lexsort((order[selected], -scores[selected]))]
+
+
+def top_k(scores, k, index=None):
+    """回傳分數最高的 k 個位置（給定 index 時回傳對應的 index 值）
+
+    與 pd.Series(scores, index).nlargest(k) 結果相同：分數遞減，同分時保留原順序。
+    """
+    scores = np.asarray(scores, dtype=float)
+    positions = _top_k_positions(scores, np.arange(len(scores)), k)
+    return positions if index is None else np.asarray(index)[positions]
+
+
+def streaming_top_k(shards, k):
+    """依序讀入 (scores, index) 分片，只保留目前的前 k 名，回傳最終前 k 名的 index 值
+
+    結果與把所有分片串接後呼叫 top_k 相同；記憶體用量只和單一分片大小與 k 有關。
+    """
+    best_scores = np.empty(0, dtype=float)
+    best_index = None
+    best_seq = np.empty(0, dtype=np.int64)
+    offset = 0
+    for scores, index in shards:
+        scores = np.asarray(scores, dtype=float)
+        index = np.asarray(index)
+        seq = np.arange(offset, offset + len(scores), dtype=np.int64)
+        offset += len(scores)
+
+        merged_scores = np.concatenate([best_scores, scores])
+        merged_index = index if best_index is None else np.concatenate([best_index, index])
+        merged_seq = np.concatenate([best_seq, seq])
+        keep = _top_k_positions(merged_scores, merged_seq, k)
+        best_scores, best_index, best_seq = merged_scores[keep], merged_index[keep], merged_seq[keep]
+    return best_index if best_index is not None else np.empty(0, dtype=np.intp)
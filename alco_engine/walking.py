@@ -0,0 +1,215 @@
+"""步行路網 - 從離線 GeoJSON 路網建立酒吧之間的步行距離矩陣
+
+路網檔為 LineString / MultiLineString 的 GeoJSON（例如以 osmium 或 ogr2ogr 從 OSM PBF 匯出信義區的道路），
+repo 不附帶此檔；找不到時呼叫端應改用直線距離（spatial.build_distance_matrix）。
+
+    graph = load_walking_graph('xinyi_walk.geojson')
+    dist = build_walking_matrix(graph, lats, lngs)   # NxN float32，路段長度直接查表
+
+酒吧先吸附到最近的路網節點（吸附距離計入步行距離），再從每個節點跑一次 Dijkstra，
+所有目標節點都確定後提早結束。路網不連通的配對改用直線距離。
+
+酒吧太多、無法建立 NxN 矩陣時改用 WalkingDistances：只預先吸附一次，
+每次請求再計算路線上少數酒吧之間的步行距離（route_distance_matrix / bar_distance 可直接使用）。
+"""
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+from .catalogue import file_digest
+from .spatial import EARTH_RADIUS_M, haversine_matrix
+
+WALKING_NETWORK_PATH = "xinyi_walk.geojson"
+# 行人不可通行的道路類型（OSM highway 標籤）
+EXCLUDED_HIGHWAYS = {'motorway', 'motorway_link', 'trunk', 'trunk_link', 'construction', 'proposed'}
+# 座標四捨五入到小數第 7 位（約 1 公分）後相同即視為同一節點
+NODE_PRECISION = 7
+# 吸附用網格邊長（公尺）
+SNAP_CELL_M = 100
+
+
+def _walkable(properties):
+    """依 OSM 標籤判斷道路是否可步行"""
+    properties = properties or {}
+    if properties.get('highway') in EXCLUDED_HIGHWAYS:
+        return False
+    return properties.get('foot') != 'no' and properties.get('access') not in ('no', 'private')
+
+
+def _project(graph, lats, lngs):
+    """以路網中心做等距圓柱投影，回傳公尺座標"""
+    lat0, lng0 = graph['origin']
+    x = EARTH_RADIUS_M * np.radians(np.asarray(lngs, dtype=float) - lng0) * math.cos(math.radians(lat0))
+    y = EARTH_RADIUS_M * np.radians(np.asarray(lats, dtype=float) - lat0)
+    return x, y
+
+
+def load_walking_graph(path=WALKING_NETWORK_PATH):
+    """讀取 GeoJSON 路網，回傳以相鄰清單表示的無向圖（dict）；檔案不存在時拋出 FileNotFoundError"""
+    with open(path, encoding='utf-8') as f:
+        features = json.load(f).get('features', [])
+
+    node_of = {}
+    lats, lngs, edge_a, edge_b = [], [], [], []
+
+    def node(coord):
+        key = (round(coord[1], NODE_PRECISION), round(coord[0], NODE_PRECISION))
+        idx = node_of.get(key)
+        if idx is None:
+            idx = node_of[key] = len(lats)
+            lats.append(key[0])
+            lngs.append(key[1])
+        return idx
+
+    for feature in features:
+        geometry = feature.get('geometry') or {}
+        if not _walkable(feature.get('properties')):
+            continue
+        if geometry.get('type') == 'LineString':
+            lines = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiLineString':
+            lines = geometry['coordinates']
+        else:
+            continue
+        for line in lines:
+            ids = [node(c) for c in line]
+            edge_a.extend(ids[:-1])
+            edge_b.extend(ids[1:])
+
+    if not lats:
+        raise ValueError(f"路網檔沒有可步行的道路: {path}")
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    edge_a = np.asarray(edge_a, dtype=np.int64)
+    edge_b = np.asarray(edge_b, dtype=np.int64)
+    keep = edge_a != edge_b
+    edge_a, edge_b = edge_a[keep], edge_b[keep]
+    lengths = _pairwise_haversine(lats[edge_a], lngs[edge_a], lats[edge_b], lngs[edge_b])
+
+    # 無向圖：每個節點的相鄰清單 [(鄰點, 公尺), ...]
+    adjacency = [[] for _ in range(len(lats))]
+    for a, b, length in zip(edge_a.tolist(), edge_b.tolist(), lengths.tolist()):
+        adjacency[a].append((b, length))
+        adjacency[b].append((a, length))
+
+    graph = {
+        'version': file_digest(path),
+        'lat': lats, 'lng': lngs,
+        'adjacency': adjacency,
+        'origin': (float(lats.mean()), float(lngs.mean())),
+    }
+    graph['x'], graph['y'] = _project(graph, lats, lngs)
+    return graph
+
+
+def load_walking_graph_if_present(path=WALKING_NETWORK_PATH):
+    """路網檔存在時載入，否則回傳 None"""
+    if not os.path.exists(path):
+        return None
+    return load_walking_graph(path)
+
+
+def _pairwise_haversine(lat1, lng1, lat2, lng2):
+    """逐對計算大圓距離（公尺）"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def snap_to_graph(graph, lats, lngs):
+    """將每個座標吸附到最近的路網節點，回傳 (節點索引, 吸附距離公尺)"""
+    x, y = _project(graph, lats, lngs)
+    cells = {}
+    for idx, (cx, cy) in enumerate(zip(np.floor(graph['x'] / SNAP_CELL_M).astype(int),
+                                       np.floor(graph['y'] / SNAP_CELL_M).astype(int))):
+        cells.setdefault((cx, cy), []).append(idx)
+    max_ring = max(1, int(max(np.ptp(graph['x']), np.ptp(graph['y'])) // SNAP_CELL_M) + 1)
+
+    nodes = np.empty(len(x), dtype=np.int64)
+    snap = np.empty(len(x))
+    for i in range(len(x)):
+        cx, cy = int(math.floor(x[i] / SNAP_CELL_M)), int(math.floor(y[i] / SNAP_CELL_M))
+        best, best_d2 = -1, math.inf
+        # 由內而外逐圈搜尋；找到候選後再多看一圈，確保最近點不在外圈
+        for ring in range(max_ring + 1):
+            if best >= 0 and (ring - 1) * SNAP_CELL_M > math.sqrt(best_d2):
+                break
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in range(cy - ring, cy + ring + 1):
+                    if max(abs(gx - cx), abs(gy - cy)) != ring:
+                        continue
+                    for idx in cells.get((gx, gy), ()):
+                        d2 = (graph['x'][idx] - x[i]) ** 2 + (graph['y'][idx] - y[i]) ** 2
+                        if d2 < best_d2:
+                            best, best_d2 = idx, d2
+        nodes[i] = best
+        snap[i] = math.sqrt(best_d2)
+    return nodes, snap
+
+
+def shortest_paths(graph, source, targets):
+    """從 source 節點跑 Dijkstra，回傳到各 targets 節點的步行距離（不可達為 inf）"""
+    adjacency = graph['adjacency']
+    remaining = set(int(t) for t in targets)
+    dist = {source: 0.0}
+    settled = set()
+    heap = [(0.0, source)]
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        remaining.discard(u)
+        for v, length in adjacency[u]:
+            nd = d + length
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    # 提早結束時所有目標都已確定；其餘未出現在 dist 中的目標不可達
+    return np.array([dist.get(int(t), math.inf) for t in targets])
+
+
+def _walking_distances(graph, nodes, snap, lats, lngs):
+    """已吸附的一組酒吧之間的步行距離矩陣（float64 公尺）；不連通的配對改用直線距離"""
+    # 多間酒吧可能吸附到同一節點，每個節點只需跑一次 Dijkstra
+    unique_nodes, inverse = np.unique(nodes, return_inverse=True)
+    node_dist = np.vstack([shortest_paths(graph, int(u), unique_nodes) for u in unique_nodes])
+
+    dist = node_dist[np.ix_(inverse, inverse)] + snap[:, None] + snap[None, :]
+    straight = haversine_matrix(lats, lngs, lats, lngs)
+    dist = np.where(np.isfinite(dist), np.maximum(dist, straight), straight)
+    np.fill_diagonal(dist, 0.0)
+    return dist
+
+
+def build_walking_matrix(graph, lats, lngs):
+    """建立 NxN float32 步行距離矩陣（公尺）；不連通的配對改用直線距離"""
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    nodes, snap = snap_to_graph(graph, lats, lngs)
+    return _walking_distances(graph, nodes, snap, lats, lngs).astype(np.float32)
+
+
+class WalkingDistances:
+    """不建立 NxN 矩陣的步行距離：建立時吸附所有酒吧，查詢時只計算所需的少數酒吧
+
+    以 bar_idx 查詢；可取代距離矩陣傳給 route_distance_matrix / bar_distance。
+    """
+
+    def __init__(self, graph, lats, lngs):
+        self.graph = graph
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        self.nodes, self.snap = snap_to_graph(graph, self.lats, self.lngs)
+
+    def submatrix(self, idx):
+        """idx 這些酒吧之間的 kxk 步行距離（公尺）"""
+        idx = np.asarray(idx, dtype=np.int64)
+        return _walking_distances(self.graph, self.nodes[idx], self.snap[idx], self.lats[idx], self.lngs[idx])
+
+    def pair(self, idx_a, idx_b):
+        """兩間酒吧的步行距離（公尺）"""
+        return float(self.submatrix([idx_a, idx_b])[0, 1])
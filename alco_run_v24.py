@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
-import folium
-from folium.plugins import MarkerCluster, MiniMap, Fullscreen
 import numpy as np
-from geopy.distance import geodesic
-import json
-from streamlit_folium import st_folium, folium_static
-import math
-import plotly.express as px
-import plotly.graph_objects as go
+import os
+import streamlit.components.v1 as components
+from datetime import datetime
+
+from alco_engine import (
+    ANCHORS, DATA_PATH, LIQUORS, DISTANCE_MATRIX_MAX_N, DISTANCE_MODE, DWELL_MINUTES, WEEKDAYS, LRUCache, StageTimer,
+    WALKING_NETWORK_PATH, WalkingDistances, activate_timer, anchor_key, build_anchor_distances, build_anchor_legs,
+    build_anchor_table, build_distance_matrix, build_leg_table, build_walking_matrix, decode_mask,
+    build_liquor_index, estimated_spend, matching_drinks, get_cached_recommendations, get_visit_window, load_catalogue,
+    load_walking_graph_if_present, plan_arrival_slots, recommendation_cache, schedule_arrival_slots,
+    slot_to_time, stage,
+)
 
 # Page configuration
 st.set_page_config(
@@ -362,26 +366,37 @@ st.markdown("""
 
 """, unsafe_allow_html=True)
 
-@st.cache_data
+@st.cache_resource
 def load_data():
-    """載入並預處理酒吧數據"""
+    """載入並預處理酒吧數據（優先讀取欄式快取）
+    
+    以 cache_resource 在所有 session 間共用同一份資料表，呼叫端不可修改。
+    """
     try:
-        df = pd.read_csv("all_info_0522.csv")
-        # 數據清理
-        df = df.dropna(subset=['final_name', 'geometry_location_lat', 'geometry_location_lng'])
-        df['price_level'] = df['price_level'].fillna(2)
-        df['rating'] = df['rating'].fillna(3.5)
-        
-        # 處理字符串字段中的NaN
-        string_columns = ['bar_style', 'music_type', 'vicinity', 'price_level_monetary', 'top_3_selection']
-        for col in string_columns:
-            df[col] = df[col].fillna('N/A')
-            
-        return df
+        return load_catalogue(DATA_PATH)
     except FileNotFoundError:
         st.error("❌ 找不到 all_info_0522.csv 文件")
         return pd.DataFrame()
 
+# 設定 ALCO_TIMING_LOG 後每個 session 都會計時並附加寫入此 JSONL 檔；否則只在 ?debug=1 時計時
+TIMING_LOG_PATH = os.environ.get('ALCO_TIMING_LOG')
+
+def get_stage_timer():
+    """本 session 的階段計時器；未啟用時回傳 None"""
+    if not TIMING_LOG_PATH and st.query_params.get('debug') != '1':
+        return None
+    if 'stage_timer' not in st.session_state:
+        st.session_state.stage_timer = StageTimer(TIMING_LOG_PATH)
+    return st.session_state.stage_timer
+
+def show_stage_timings(slot, timer):
+    """在除錯面板顯示各階段的 p50/p95（毫秒）"""
+    summary = timer.summary() if timer else {}
+    if summary:
+        slot.dataframe(pd.DataFrame.from_dict(summary, orient='index'), use_container_width=True)
+    else:
+        slot.caption("尚無計時資料")
+
 def generate_time_options():
     """生成固定的時間選項"""
     # 開始時間選項：18:00-次日3:00AM，每隔一個小時
@@ -414,165 +429,128 @@ def generate_time_options():
     
     return start_options, end_options
 
-def calculate_advanced_score(bar, preferences):
-    """進階推薦算法"""
-    score = 0
-    max_score = 1.0
-    
-    # 價格匹配 (35% 權重)
-    price_target = preferences.get('price_point', 500)
-    if pd.notna(bar['price_level']) and bar['price_level'] > 0:
-        estimated_price = bar['price_level'] * 400  # 估算實際價格
-        price_diff = abs(estimated_price - price_target)
-        price_score = max(0, 1 - (price_diff / 600))  # 600元內差異可接受
-        score += price_score * 0.35
-    
-    # 風格匹配 (25% 權重)
-    bar_styles_pref = preferences.get('bar_styles', {})
-    
-    # 檢查是否選擇了「沒有偏好」
-    if bar_styles_pref.get('沒有偏好', False):
-        # 如果選擇了「沒有偏好」，給予滿分
-        score += 0.25
-    else:
-        # 正常風格匹配邏輯
-        selected_styles = [k for k, v in bar_styles_pref.items() if v and k != '沒有偏好']
-        if selected_styles and bar['bar_style'] != 'N/A':
-            bar_styles = str(bar['bar_style']).split(', ')
-            style_matches = sum(1 for style in selected_styles if any(s.strip() == style for s in bar_styles))
-            if style_matches > 0:
-                score += (style_matches / len(selected_styles)) * 0.25
-    
-    # 音樂匹配 (20% 權重)
-    music_types_pref = preferences.get('music_types', {})
-    
-    # 檢查是否選擇了「沒有偏好」
-    if music_types_pref.get('沒有偏好', False):
-        # 如果選擇了「沒有偏好」，給予滿分
-        score += 0.20
-    else:
-        # 正常音樂匹配邏輯
-        selected_music = [k for k, v in music_types_pref.items() if v and k != '沒有偏好']
-        if selected_music and bar['music_type'] != 'N/A':
-            music_types = str(bar['music_type']).split(', ')
-            music_matches = sum(1 for music in selected_music if any(m.strip() == music for m in music_types))
-            if music_matches > 0:
-                score += (music_matches / len(selected_music)) * 0.20
-    
-    # 評分加成 (15% 權重)
-    if pd.notna(bar['rating']) and bar['rating'] > 0:
-        rating_normalized = (bar['rating'] - 1) / 4  # 1-5 標準化到 0-1
-        score += rating_normalized * 0.15
-    
-    # 熱門度加成 (5% 權重)
-    if pd.notna(bar['user_ratings_total']) and bar['user_ratings_total'] > 0:
-        popularity_score = min(1.0, math.log(bar['user_ratings_total'] + 1) / 10)
-        score += popularity_score * 0.05
-    
-    return min(score, max_score)
-
-def optimize_route(recommendations):
-    """簡單的路線優化 - 最近鄰居法"""
-    if len(recommendations) <= 2:
-        return recommendations
-    
-    # 起點選擇評分最高的
-    optimized = [recommendations.iloc[0]]
-    remaining = list(range(1, len(recommendations)))
-    current_idx = 0
-    
-    while remaining:
-        current_bar = recommendations.iloc[current_idx]
-        min_distance = float('inf')
-        next_idx = None
-        
-        for idx in remaining:
-            candidate = recommendations.iloc[idx]
-            distance = geodesic(
-                (current_bar['geometry_location_lat'], current_bar['geometry_location_lng']),
-                (candidate['geometry_location_lat'], candidate['geometry_location_lng'])
-            ).meters
-            
-            if distance < min_distance:
-                min_distance = distance
-                next_idx = idx
-        
-        optimized.append(recommendations.iloc[next_idx])
-        remaining.remove(next_idx)
-        current_idx = next_idx
-    
-    return pd.DataFrame(optimized).reset_index(drop=True)
+@st.cache_resource
+def get_walking_graph():
+    """離線步行路網；找不到路網檔時回傳 None，距離改用直線計算"""
+    return load_walking_graph_if_present(WALKING_NETWORK_PATH)
+
+@st.cache_resource
+def _cached_distance_matrix(dataset_version, mode, _lats, _lngs, _graph=None):
+    """每個資料版本（與路網版本）只建立一次距離矩陣，所有 session 共用"""
+    if _graph is not None:
+        return build_walking_matrix(_graph, _lats, _lngs)
+    return build_distance_matrix(_lats, _lngs, mode)
+
+@st.cache_resource
+def _cached_walking_distances(dataset_version, graph_version, _lats, _lngs, _graph):
+    """資料量過大時的步行距離：只吸附一次，路線上的距離按需計算"""
+    return WalkingDistances(_graph, _lats, _lngs)
 
-def get_smart_recommendations(df, preferences, top_n=6):
-    """智能推薦系統"""
-    # 計算推薦分數
-    df['recommendation_score'] = df.apply(
-        lambda x: calculate_advanced_score(x, preferences), axis=1
+def get_distance_matrix(df, mode=DISTANCE_MODE):
+    """取得整個資料集的距離來源；有步行路網時為步行距離
+
+    資料量過大時不建立 NxN 矩陣：有路網時回傳按需計算的 WalkingDistances，
+    否則回傳 None，由 route_distance_matrix 即時以直線距離計算。
+    """
+    graph = get_walking_graph()
+    if len(df) > DISTANCE_MATRIX_MAX_N:
+        if graph is None:
+            return None
+        return _cached_walking_distances(
+            df.attrs['dataset_version'], graph['version'],
+            df['geometry_location_lat'].to_numpy(), df['geometry_location_lng'].to_numpy(), graph
+        )
+    if graph is not None:
+        mode = f"walking:{graph['version']}"
+    return _cached_distance_matrix(
+        df.attrs['dataset_version'], mode,
+        df['geometry_location_lat'].to_numpy(), df['geometry_location_lng'].to_numpy(), graph
     )
-    
-    # 選擇前N個候選
-    candidates = df.nlargest(top_n * 2, 'recommendation_score')
-    
-    # 地理分散性考慮 - 避免所有酒吧都在同一區域
-    final_recommendations = []
-    used_locations = []
-    min_distance = 300  # 最少300米間距
-    
-    for _, bar in candidates.iterrows():
-        if len(final_recommendations) >= top_n:
-            break
-            
-        current_loc = (bar['geometry_location_lat'], bar['geometry_location_lng'])
-        
-        # 檢查與已選酒吧的距離
-        too_close = False
-        for used_loc in used_locations:
-            if geodesic(current_loc, used_loc).meters < min_distance:
-                too_close = True
-                break
-        
-        if not too_close:
-            final_recommendations.append(bar)
-            used_locations.append(current_loc)
-    
-    # 如果地理分散後數量不足，補充剩餘的高分酒吧
-    if len(final_recommendations) < top_n:
-        remaining_need = top_n - len(final_recommendations)
-        remaining_bars = candidates[~candidates.index.isin([bar.name for bar in final_recommendations])]
-        final_recommendations.extend(remaining_bars.head(remaining_need).to_dict('records'))
-    
-    result_df = pd.DataFrame(final_recommendations)
-    
-    # 路線優化
-    if len(result_df) > 2:
-        result_df = optimize_route(result_df)
-    
-    return result_df
 
-def calculate_walking_time(lat1, lon1, lat2, lon2, speed_kmh=4.5):
-    """計算步行時間，考慮不同步行速度"""
-    distance = geodesic((lat1, lon1), (lat2, lon2)).meters
-    speed_ms = (speed_kmh * 1000) / 60  # 轉換為 m/min
-    walking_time = distance / speed_ms
-    return math.ceil(walking_time)
+@st.cache_resource
+def _cached_anchor_table(dataset_version, graph_version, _df, _graph=None):
+    """每個資料版本（與路網版本）只計算一次各具名錨點到所有酒吧的距離向量"""
+    return build_anchor_table(_df, graph=_graph)
+
+@st.cache_resource(max_entries=32)
+def _cached_custom_anchor(dataset_version, graph_version, lat, lng, _df, _graph=None):
+    return build_anchor_distances(_df, lat, lng, _graph)
+
+def get_anchor_table(df, anchors=()):
+    """具名錨點的距離向量，再加上本次使用的自訂座標"""
+    graph = get_walking_graph()
+    graph_version = graph['version'] if graph is not None else None
+    table = dict(_cached_anchor_table(df.attrs['dataset_version'], graph_version, df, graph))
+    for anchor in anchors:
+        if anchor is not None and not isinstance(anchor, str):
+            key = anchor_key(anchor)
+            table[key] = _cached_custom_anchor(df.attrs['dataset_version'], graph_version, *key, df, graph)
+    return table
+
+@st.cache_resource
+def _cached_liquor_index(dataset_version, _df):
+    """基酒倒排索引，每個資料版本只建立一次"""
+    return build_liquor_index(_df)
+
+def get_liquor_index(df):
+    return _cached_liquor_index(df.attrs['dataset_version'], df)
+
+ANCHOR_NONE = "不指定"
+ANCHOR_CUSTOM = "自訂座標"
 
-def get_unique_bar_styles(recommendations):
+def anchor_selector(label, key):
+    """起點 / 終點錨點選單；回傳錨點名稱、(lat, lng) 或 None"""
+    choice = st.selectbox(label, [ANCHOR_NONE, *ANCHORS, ANCHOR_CUSTOM], key=key)
+    if choice == ANCHOR_NONE:
+        return None
+    if choice == ANCHOR_CUSTOM:
+        col1, col2 = st.columns(2)
+        with col1:
+            lat = st.number_input("緯度", value=25.0360, format="%.5f", key=f"{key}_lat")
+        with col2:
+            lng = st.number_input("經度", value=121.5680, format="%.5f", key=f"{key}_lng")
+        return (lat, lng)
+    return choice
+
+def get_unique_bar_styles(recommendations, style_vocab):
     """提取推薦結果中的所有唯一酒吧風格"""
     if recommendations.empty:
         return []
     
-    all_styles = set()
-    for _, bar in recommendations.iterrows():
-        if bar['bar_style'] != 'N/A':
-            styles = [style.strip() for style in str(bar['bar_style']).split(',')]
-            all_styles.update(styles)
-    
-    return sorted(list(all_styles))
+    union_mask = np.bitwise_or.reduce(np.asarray(recommendations['style_mask'], dtype=np.uint64))
+    return decode_mask(union_mask, style_vocab)
 
-def create_interactive_map(recommendations, show_styles=None):
-    """創建進階互動地圖"""
+# 風格名稱對應的emoji和顯示名稱
+STYLE_DISPLAY = {
+    '夜店型酒吧': {'emoji': '🌃', 'name': '夜店型酒吧'},
+    '立飲酒吧': {'emoji': '🍺', 'name': '立飲酒吧'},
+    '餐酒館': {'emoji': '🍽️', 'name': '餐酒館'},
+    '精緻酒吧': {'emoji': '✨', 'name': '精緻酒吧'},
+    '啤酒專門店': {'emoji': '🍻', 'name': '啤酒專門店'},
+    '威士忌酒吧': {'emoji': '🥃', 'name': '威士忌酒吧'},
+    '茶酒酒吧': {'emoji': '🍵', 'name': '茶酒酒吧'},
+    '咖啡餐酒館': {'emoji': '☕', 'name': '咖啡餐酒館'},
+    '音樂酒吧': {'emoji': '🎵', 'name': '音樂酒吧'},
+    '運動酒吧': {'emoji': '⚽', 'name': '運動酒吧'},
+    '露天酒吧': {'emoji': '🌙', 'name': '露天酒吧'},
+    '主題酒吧': {'emoji': '🎭', 'name': '主題酒吧'},
+    '調酒吧': {'emoji': '🍸', 'name': '調酒吧'},
+    '清酒吧': {'emoji': '🍶', 'name': '清酒吧'}
+}
+
+def style_layer_name(style):
+    """地圖圖層選單中的風格名稱"""
+    display_info = STYLE_DISPLAY.get(style, {'emoji': '🏪', 'name': style})
+    return f"{display_info['emoji']} {display_info['name']}"
+
+def create_interactive_map(recommendations, styles, legs, anchor_legs=None):
+    """創建進階互動地圖 - 每種風格一個 FeatureGroup，由圖層選單在瀏覽器端篩選"""
     if recommendations.empty:
         return None
+
+    # folium 只在產生路線後才載入，歡迎頁不需付出匯入成本
+    import folium
+    from folium.plugins import MiniMap, Fullscreen
     
     # 地圖中心點
     center_lat = recommendations['geometry_location_lat'].mean()
@@ -588,6 +566,11 @@ def create_interactive_map(recommendations, show_styles=None):
     # 統一的標記顏色 - 使用藍色系讓數字更顯眼
     unified_color = '#3498db'
     
+    # 每種風格一個圖層；多風格酒吧在各圖層各放一個標記，任一圖層開啟即會顯示
+    style_groups = {style: folium.FeatureGroup(name=style_layer_name(style)) for style in styles}
+    other_group = folium.FeatureGroup(name=style_layer_name('其他'))
+    used_groups = []
+    
     # 添加酒吧標記
     for idx, bar in recommendations.iterrows():
         lat, lng = bar['geometry_location_lat'], bar['geometry_location_lng']
@@ -597,16 +580,6 @@ def create_interactive_map(recommendations, show_styles=None):
         if bar['bar_style'] != 'N/A':
             bar_styles_list = [style.strip() for style in str(bar['bar_style']).split(',')]
         
-        # 風格篩選
-        if show_styles:
-            should_show = False
-            for style in bar_styles_list:
-                if style in show_styles:
-                    should_show = True
-                    break
-            if not should_show:
-                continue
-        
         # 創建詳細彈出窗口
         popup_html = f"""
         <div style="font-family: Arial, sans-serif; width: 400px; padding: 12px;">
@@ -642,35 +615,62 @@ def create_interactive_map(recommendations, show_styles=None):
         popup_html += "</div>"
         
         # 統一顏色的數字標記
-        folium.Marker(
-            location=[lat, lng],
-            popup=folium.Popup(popup_html, max_width=420),
-            tooltip=f"{idx+1}. {bar['final_name']} ({', '.join(bar_styles_list)})",
-            icon=folium.DivIcon(
-                html=f'''
-                <div style="
-                    font-size: 14px; 
-                    color: white; 
-                    font-weight: bold; 
-                    text-align: center; 
-                    background-color: {unified_color}; 
-                    border: 3px solid white;
-                    border-radius: 50%; 
-                    width: 30px; 
-                    height: 30px; 
-                    line-height: 24px;
-                    box-shadow: 0 3px 6px rgba(0,0,0,0.4);
-                ">{idx+1}</div>
-                ''',
-                icon_size=(30, 30),
-                icon_anchor=(15, 15)
-            )
-        ).add_to(m)
-    
-    # 添加路線
-    if len(recommendations) > 1:
-        locations = [(row['geometry_location_lat'], row['geometry_location_lng']) 
-                    for idx, row in recommendations.iterrows()]
+        groups = [style_groups[style] for style in bar_styles_list if style in style_groups] or [other_group]
+        for group in groups:
+            if group not in used_groups:
+                used_groups.append(group)
+            folium.Marker(
+                location=[lat, lng],
+                popup=folium.Popup(popup_html, max_width=420),
+                tooltip=f"{idx+1}. {bar['final_name']} ({', '.join(bar_styles_list)})",
+                icon=folium.DivIcon(
+                    html=f'''
+                    <div style="
+                        font-size: 14px; 
+                        color: white; 
+                        font-weight: bold; 
+                        text-align: center; 
+                        background-color: {unified_color}; 
+                        border: 3px solid white;
+                        border-radius: 50%; 
+                        width: 30px; 
+                        height: 30px; 
+                        line-height: 24px;
+                        box-shadow: 0 3px 6px rgba(0,0,0,0.4);
+                    ">{idx+1}</div>
+                    ''',
+                    icon_size=(30, 30),
+                    icon_anchor=(15, 15)
+                )
+            ).add_to(group)
+    
+    for group in used_groups:
+        group.add_to(m)
+    
+    # 起點 / 終點錨點
+    anchor_legs = anchor_legs or {}
+    start_leg, end_leg = anchor_legs.get('start'), anchor_legs.get('end')
+    if start_leg or end_leg:
+        anchor_group = folium.FeatureGroup(name="📍 起點 / 終點")
+        for leg, icon, color in ((start_leg, 'play', 'green'), (end_leg, 'flag', 'red')):
+            if leg:
+                folium.Marker(
+                    location=[leg['lat'], leg['lng']],
+                    tooltip=leg['name'],
+                    icon=folium.Icon(color=color, icon=icon, prefix='fa')
+                ).add_to(anchor_group)
+        anchor_group.add_to(m)
+    
+    # 添加路線（由路段表取得座標）
+    if legs:
+        locations = [(legs[0]['from_lat'], legs[0]['from_lng'])] + [(leg['to_lat'], leg['to_lng']) for leg in legs]
+    else:
+        locations = [(recommendations['geometry_location_lat'].iat[0], recommendations['geometry_location_lng'].iat[0])]
+    if start_leg:
+        locations.insert(0, (start_leg['lat'], start_leg['lng']))
+    if end_leg:
+        locations.append((end_leg['lat'], end_leg['lng']))
+    if len(locations) > 1:
         
         folium.PolyLine(
             locations=locations,
@@ -679,107 +679,194 @@ def create_interactive_map(recommendations, show_styles=None):
             opacity=0.8,
             dash_array='10, 5',
             tooltip="推薦路線"
-        ).add_to(m)
+        ).add_to(folium.FeatureGroup(name="🚶 推薦路線").add_to(m))
     
     # 添加插件
     MiniMap().add_to(m)
     Fullscreen().add_to(m)
+    folium.LayerControl(collapsed=False).add_to(m)
     
     return m
 
-def display_route_panel(recommendations, preferences):
-    """顯示左側路線面板"""
-    if recommendations.empty:
-        st.warning("⚠️ 暫無推薦結果")
-        return
+# 地圖 HTML 快取設定
+MAP_HTML_CACHE_SIZE = 64
+MAP_WIDTH = 1000
+MAP_HEIGHT = 500
+
+@st.cache_resource
+def get_map_html_cache():
+    """跨 session 共用的地圖 HTML LRU 快取"""
+    return LRUCache(MAP_HTML_CACHE_SIZE)
+
+def route_fingerprint(recommendations, styles, anchor_legs=None):
+    """路線指紋：資料版本 + 依序的 place_id + 風格圖層 + 起點 / 終點錨點"""
+    anchor_legs = anchor_legs or {}
+    return (
+        recommendations.attrs.get('dataset_version'),
+        tuple(recommendations['place_id']),
+        tuple(styles),
+        tuple((leg['name'], leg['lat'], leg['lng']) if leg else None
+              for leg in (anchor_legs.get('start'), anchor_legs.get('end'))),
+    )
+
+def render_route_map_html(recommendations, styles, legs, anchor_legs=None):
+    """取得路線地圖 HTML；路線與篩選條件相同時直接使用快取，不重建 folium 地圖"""
+    def build():
+        import folium
+
+        with stage('create_interactive_map'):
+            route_map = create_interactive_map(recommendations, styles, legs, anchor_legs)
+        with stage('map_render'):
+            return folium.Figure().add_child(route_map).render()
+    return get_map_html_cache().get_or_create(route_fingerprint(recommendations, styles, anchor_legs), build)
+
+PANEL_HTML_CACHE_SIZE = 64
+
+@st.cache_resource
+def get_panel_html_cache():
+    """跨 session 共用的路線面板 HTML LRU 快取"""
+    return LRUCache(PANEL_HTML_CACHE_SIZE)
+
+def build_route_panel_html(recommendations, preferences, legs, anchor_legs=None, liquor_matches=None):
+    """將整個路線面板組成單一 HTML 區塊，一次 st.markdown 即可送出
     
-    # 路線標題
-    st.markdown(f"""
-    <div class="route-header">
-        <h2>🍺 您的酒精路跑路線規劃</h2>
-        <p>⏰ {preferences.get('time_start', '19:00')} - {preferences.get('time_end', '23:00')} | 🏪 {len(recommendations)} 間酒吧</p>
-    </div>
-    """, unsafe_allow_html=True)
+    每段 HTML 都不換行、不縮排，避免被 Markdown 當成程式碼區塊。
+    """
+    p_style = "font-size: 12px; margin: 2px 0; color: #e0e0e0;"
+    label_style = "color: #ffffff;"
+    box_style = "text-align: center; padding: 5px; background: #2d3748; border-radius: 5px; margin: 2px 0; border: 1px solid #4a5568;"
     
-    # 計算總體統計
-    total_walking_time = 0
-    total_distance = 0
+    # 路線標題
+    parts = [
+        "<div class='route-header'>"
+        "<h2>🍺 您的酒精路跑路線規劃</h2>"
+        f"<p>⏰ {preferences.get('time_start', '19:00')} - {preferences.get('time_end', '23:00')} | 🏪 {len(recommendations)} 間酒吧"
+        f" | 💰 預估 NT${estimated_spend(recommendations).sum():,.0f}</p>"
+        "</div>"
+    ]
+    anchor_legs = anchor_legs or {}
+    start_leg, end_leg = anchor_legs.get('start'), anchor_legs.get('end')
+    anchor_style = "background: #14532d; padding: 6px 10px; border-radius: 5px; margin: 8px 0; border-left: 3px solid #22c55e; color: #ffffff;"
+    if start_leg:
+        parts.append(
+            f"<div style='{anchor_style}'>"
+            f"<span style='font-size: 12px; color: #ffffff;'>🚇 從 {start_leg['name']} 出發，步行到第一間: <strong>{start_leg['minutes']} 分鐘</strong> ({start_leg['meters']:.0f}m)</span>"
+            "</div>"
+        )
+    
+    # 各站預計抵達時間
+    visit_window = get_visit_window(preferences)
+    if visit_window and preferences.get('planner') == 'orienteering':
+        # 依時段規劃的路線：停留時間 + 實際步行時間（含從起點走到第一間）
+        arrival_slots = schedule_arrival_slots(visit_window[1], [leg['minutes'] for leg in legs],
+                                               preferences.get('dwell_minutes', DWELL_MINUTES),
+                                               start_leg['minutes'] if start_leg else 0)
+    elif visit_window:
+        arrival_slots = plan_arrival_slots(visit_window[1], visit_window[2], len(recommendations))
+    else:
+        arrival_slots = None
     
     for idx, bar in recommendations.iterrows():
         # 酒吧卡片
-        st.markdown(f"""
-        <div class="bar-card">
-            <h3>🏅 {idx+1}. {bar['final_name']}</h3>
-        </div>
-        """, unsafe_allow_html=True)
+        parts.append(f"<div class='bar-card'><h3>🏅 {idx+1}. {bar['final_name']}</h3></div>")
         
-        # 詳細信息
-        col1, col2 = st.columns([3, 1])  # 調整比例讓酒單資訊有更多空間
+        # 詳細信息（左 3 : 右 1，讓酒單資訊有更多空間）
+        details = []
+        if arrival_slots:
+            details.append(f"<p style='{p_style}'><strong style='{label_style}'>🕒 預計抵達:</strong> {slot_to_time(arrival_slots[idx])}</p>")
+        details.append(f"<p style='{p_style}'><strong style='{label_style}'>🏪 風格:</strong> {bar['bar_style']}</p>")
+        details.append(f"<p style='{p_style}'><strong style='{label_style}'>🎵 音樂:</strong> {bar['music_type']}</p>")
+        details.append(f"<p style='{p_style}'><strong style='{label_style}'>📍 地址:</strong> {bar['vicinity']}</p>")
+        if liquor_matches and liquor_matches[idx]:
+            matched = '、'.join(f"{liquor}（{'、'.join(names)}）" for liquor, names in liquor_matches[idx].items())
+            details.append(f"<p style='{p_style}'><strong style='{label_style}'>🥃 符合基酒:</strong> {matched}</p>")
         
-        with col1:
-            st.markdown(f"<p style='font-size: 12px; margin: 2px 0; color: #e0e0e0;'><strong style='color: #ffffff;'>🏪 風格:</strong> {bar['bar_style']}</p>", unsafe_allow_html=True)
-            st.markdown(f"<p style='font-size: 12px; margin: 2px 0; color: #e0e0e0;'><strong style='color: #ffffff;'>🎵 音樂:</strong> {bar['music_type']}</p>", unsafe_allow_html=True)
-            st.markdown(f"<p style='font-size: 12px; margin: 2px 0; color: #e0e0e0;'><strong style='color: #ffffff;'>📍 地址:</strong> {bar['vicinity']}</p>", unsafe_allow_html=True)
-            
-            # 新增人氣酒單資訊
-            if pd.notna(bar.get('top_3_selection')) and bar['top_3_selection'] != 'N/A':
-                # 處理酒單資訊，分割成個別項目
-                drinks = str(bar['top_3_selection']).split(', ')
-                drinks_text = '<br>'.join([f"• {drink.strip()}" for drink in drinks])
-                st.markdown(f"""
-                <div style='font-size: 12px; margin: 6px 0; padding: 8px; background: #2d3748; border-radius: 5px; border: 1px solid #4a5568;'>
-                    <strong style='color: #ffffff;'>🍹 人氣酒單:</strong><br>
-                    <div style='color: #e0e0e0; margin-top: 4px; line-height: 1.4;'>{drinks_text}</div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"<p style='font-size: 12px; margin: 2px 0; color: #e0e0e0;'><strong style='color: #ffffff;'>🍹 人氣酒單:</strong> 暫無資料</p>", unsafe_allow_html=True)
-            
-        with col2:
-            st.markdown(f"""
-            <div style='text-align: center; padding: 5px; background: #2d3748; border-radius: 5px; margin: 2px 0; border: 1px solid #4a5568;'>
-                <div style='font-size: 11px; color: #a0a0a0;'>⭐ 評分</div>
-                <div style='font-size: 16px; font-weight: bold; color: #ffffff;'>{bar['rating']:.1f}</div>
-                <div style='font-size: 10px; color: #cbd5e0;'>{bar['user_ratings_total']} 評論</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if bar['price_level_monetary'] != 'N/A':
-                st.markdown(f"""
-                <div style='text-align: center; padding: 5px; background: #2d3748; border-radius: 5px; margin: 2px 0; border: 1px solid #4a5568;'>
-                    <div style='font-size: 11px; color: #a0a0a0;'>💰 價位</div>
-                    <div style='font-size: 14px; font-weight: bold; color: #ffffff;'>{bar['price_level_monetary']}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        # 人氣酒單資訊
+        if pd.notna(bar.get('top_3_selection')) and bar['top_3_selection'] != 'N/A':
+            drinks = str(bar['top_3_selection']).split(', ')
+            drinks_text = '<br>'.join([f"• {drink.strip()}" for drink in drinks])
+            details.append(
+                "<div style='font-size: 12px; margin: 6px 0; padding: 8px; background: #2d3748; border-radius: 5px; border: 1px solid #4a5568;'>"
+                f"<strong style='{label_style}'>🍹 人氣酒單:</strong><br>"
+                f"<div style='color: #e0e0e0; margin-top: 4px; line-height: 1.4;'>{drinks_text}</div>"
+                "</div>"
+            )
+        else:
+            details.append(f"<p style='{p_style}'><strong style='{label_style}'>🍹 人氣酒單:</strong> 暫無資料</p>")
+        
+        stats = [
+            f"<div style='{box_style}'>"
+            "<div style='font-size: 11px; color: #a0a0a0;'>⭐ 評分</div>"
+            f"<div style='font-size: 16px; font-weight: bold; color: #ffffff;'>{bar['rating']:.1f}</div>"
+            f"<div style='font-size: 10px; color: #cbd5e0;'>{bar['user_ratings_total']} 評論</div>"
+            "</div>"
+        ]
+        if bar['price_level_monetary'] != 'N/A':
+            stats.append(
+                f"<div style='{box_style}'>"
+                "<div style='font-size: 11px; color: #a0a0a0;'>💰 價位</div>"
+                f"<div style='font-size: 14px; font-weight: bold; color: #ffffff;'>{bar['price_level_monetary']}</div>"
+                "</div>"
+            )
+        
+        parts.append(
+            "<div style='display: flex; gap: 1rem;'>"
+            f"<div style='flex: 3; min-width: 0;'>{''.join(details)}</div>"
+            f"<div style='flex: 1; min-width: 0;'>{''.join(stats)}</div>"
+            "</div>"
+        )
         
         # 到下一間的路線信息
-        if idx < len(recommendations) - 1:
-            next_bar = recommendations.iloc[idx + 1]
-            walking_time = calculate_walking_time(
-                bar['geometry_location_lat'], bar['geometry_location_lng'],
-                next_bar['geometry_location_lat'], next_bar['geometry_location_lng']
+        if idx < len(legs):
+            leg = legs[idx]
+            parts.append(
+                "<div style='background: #1e3a8a; padding: 6px 10px; border-radius: 5px; margin: 8px 0; border-left: 3px solid #3b82f6; color: #ffffff;'>"
+                f"<span style='font-size: 12px; color: #ffffff;'>🚶‍♂️ 步行到下一間: <strong>{leg['minutes']} 分鐘</strong> ({leg['meters']:.0f}m)</span>"
+                "</div>"
             )
-            distance = geodesic(
-                (bar['geometry_location_lat'], bar['geometry_location_lng']),
-                (next_bar['geometry_location_lat'], next_bar['geometry_location_lng'])
-            ).meters
-            
-            total_walking_time += walking_time
-            total_distance += distance
-            
-            st.markdown(f"""
-            <div style='background: #1e3a8a; padding: 6px 10px; border-radius: 5px; margin: 8px 0; border-left: 3px solid #3b82f6; color: #ffffff;'>
-                <span style='font-size: 12px; color: #ffffff;'>🚶‍♂️ 步行到下一間: <strong>{walking_time} 分鐘</strong> ({distance:.0f}m)</span>
-            </div>
-            """, unsafe_allow_html=True)
         
-        st.markdown("<hr style='margin: 10px 0; border: 1px solid #4a5568;'>", unsafe_allow_html=True)
+        parts.append("<hr style='margin: 10px 0; border: 1px solid #4a5568;'>")
+    
+    if end_leg:
+        parts.append(
+            f"<div style='{anchor_style}'>"
+            f"<span style='font-size: 12px; color: #ffffff;'>🚕 最後一間步行到 {end_leg['name']}: <strong>{end_leg['minutes']} 分鐘</strong> ({end_leg['meters']:.0f}m)</span>"
+            "</div>"
+        )
+    
+    return ''.join(parts)
+
+def display_route_panel(recommendations, preferences, legs, anchor_legs=None, liquor_matches=None):
+    """顯示左側路線面板（整個面板一次送出，並依路線快取 HTML）"""
+    if recommendations.empty:
+        st.warning("⚠️ 暫無推薦結果")
+        return
+    
+    key = (
+        recommendations.attrs.get('dataset_version'),
+        tuple(recommendations['place_id']),
+        preferences.get('time_start'), preferences.get('time_end'), preferences.get('weekday'),
+        preferences.get('planner'), preferences.get('dwell_minutes'),
+        anchor_key(preferences.get('start_anchor')), anchor_key(preferences.get('end_anchor')),
+        tuple(sorted(k for k, v in preferences.get('liquors', {}).items() if v)),
+    )
+    with stage('route_panel'):
+        html = get_panel_html_cache().get_or_create(
+            key, lambda: build_route_panel_html(recommendations, preferences, legs, anchor_legs, liquor_matches)
+        )
+    st.markdown(html, unsafe_allow_html=True)
 
 def main():
     st.title("🍺 酒精路跑智能推薦系統")
     
+    # 階段計時（未啟用時各 stage 幾乎不花成本）
+    timer = get_stage_timer()
+    activate_timer(timer)
+    timing_slot = None
+    
     # 載入數據
-    df = load_data()
+    with stage('load_data'):
+        df = load_data()
     if df.empty:
         st.stop()
     
@@ -789,8 +876,12 @@ def main():
     # 初始化 session state
     if 'preferences' not in st.session_state:
         st.session_state.preferences = {}
-    if 'recommendations' not in st.session_state:
-        st.session_state.recommendations = pd.DataFrame()
+    if 'route' not in st.session_state:
+        st.session_state.route = []  # 路線上酒吧在 df 中的列索引（已依造訪順序排列）
+    if 'route_legs' not in st.session_state:
+        st.session_state.route_legs = []  # 路段表，見 build_leg_table
+    if 'route_anchor_legs' not in st.session_state:
+        st.session_state.route_anchor_legs = {}  # 起點 / 終點錨點路段，見 build_anchor_legs
     
     # 側邊欄 - 偏好設定
     with st.sidebar:
@@ -803,6 +894,9 @@ def main():
             
             end_time_index = 4  # 默認選擇23:00 (19:00是index 0，23:00是index 4)
             end_time = st.selectbox("結束時間", end_options, index=end_time_index)
+            
+            # 依星期判斷營業時間（預設今天）
+            weekday = st.selectbox("星期", WEEKDAYS, index=datetime.now().weekday())
         
         with st.expander("🍷 酒吧風格偏好", expanded=True):
             # 酒吧風格和定義
@@ -843,115 +937,113 @@ def main():
             # 添加「沒有偏好」選項
             music_selections['沒有偏好'] = st.checkbox('沒有偏好', key="music_no_preference")
         
+        with st.expander("🥃 基酒偏好", expanded=False):
+            selected_liquors = st.multiselect("今晚想喝的基酒（可複選）", LIQUORS, key="liquors")
+        
         with st.expander("💰 預算設定", expanded=True):
             price_point = st.slider("單間預算 (NT$)", 200, 2000, 500, 50)
+            night_budget = st.slider("整晚預算 (NT$)", 0, 10000, 0, 500, help="0 表示不限制；依各站價位區間中點估算")
             
         with st.expander("🏠 環境偏好", expanded=False):
             venue_type = st.radio("場地偏好", ["室內", "室外", "兩者皆可"])
             ambiance = st.selectbox("氛圍偏好", ["熱鬧", "安靜", "適中"])
         
+        with st.expander("🧭 路線規劃", expanded=False):
+            fit_window = st.checkbox("依時段自動決定站數與順序", key="planner_orienteering",
+                                     help="在開始與結束時間內，同時挑選酒吧與造訪順序，讓總推薦分數最高")
+            dwell_minutes = DWELL_MINUTES
+            if fit_window:
+                dwell_minutes = st.slider("每站停留時間（分鐘）", 20, 90, DWELL_MINUTES, 5)
+            start_anchor = anchor_selector("起點", "start_anchor")
+            end_anchor = anchor_selector("終點", "end_anchor")
+        
+        # 除錯資訊（網址加上 ?debug=1 顯示）
+        if st.query_params.get('debug') == '1':
+            with st.expander("🛠️ 除錯資訊", expanded=False):
+                st.caption("地圖 HTML 快取")
+                st.json(get_map_html_cache().stats())
+                st.caption("路線面板 HTML 快取")
+                st.json(get_panel_html_cache().stats())
+                st.caption("距離來源")
+                if get_walking_graph() is None:
+                    st.text("直線距離（找不到步行路網檔）")
+                elif len(df) > DISTANCE_MATRIX_MAX_N:
+                    st.text("步行路網（酒吧數過多，按需計算）")
+                else:
+                    st.text("步行路網（完整距離矩陣）")
+                st.caption("推薦結果快取（全行程共用）")
+                st.json(recommendation_cache.stats())
+                st.caption("各階段耗時（本 session）")
+                timing_slot = st.empty()
+        
         # 更新推薦按鈕
         if st.button("🚀 生成推薦路線", use_container_width=True, type="primary"):
             preferences = {
                 'time_start': start_time,
                 'time_end': end_time,
+                'weekday': weekday,
                 'bar_styles': bar_style_selections,
                 'music_types': music_selections,
+                'liquors': {liquor: True for liquor in selected_liquors},
                 'price_point': price_point,
-                'venue_type': venue_type
+                'night_budget': night_budget or None,
+                'venue_type': venue_type,
+                'planner': 'orienteering' if fit_window else 'ranked',
+                'dwell_minutes': dwell_minutes,
+                'start_anchor': start_anchor,
+                'end_anchor': end_anchor
             }
             
             st.session_state.preferences = preferences
-            st.session_state.recommendations = get_smart_recommendations(df, preferences)
-            st.success("✅ 推薦路線已生成！")
-            st.rerun()
+            # 距離矩陣（每個資料版本只建立一次，第一次生成路線時才計算）
+            with stage('distance_matrix'):
+                dist = get_distance_matrix(df)
+            # 錨點距離向量（具名錨點每個資料版本只算一次）
+            with stage('anchor_table'):
+                anchor_table = get_anchor_table(df, (start_anchor, end_anchor))
+            with stage('recommend'):
+                route = get_cached_recommendations(df, preferences, dist=dist, anchor_table=anchor_table)
+            st.session_state.route = route.tolist()
+            with stage('leg_table'):
+                st.session_state.route_legs = build_leg_table(df, route, dist)
+                st.session_state.route_anchor_legs = build_anchor_legs(df, route, preferences, anchor_table)
+            if len(route) == 0:
+                st.warning("⚠️ 找不到符合條件的路線，請放寬時段或提高整晚預算")
+            else:
+                st.success("✅ 推薦路線已生成！")
+                st.rerun()
     
     # 主要內容區域
-    if not st.session_state.recommendations.empty:
+    if st.session_state.route:
+        recommendations = df.iloc[st.session_state.route].reset_index(drop=True)
+        
         # 創建主要布局
         col1, col2 = st.columns([1, 2])
         
         with col1:
-            display_route_panel(st.session_state.recommendations, st.session_state.preferences)
+            # 各站符合所選基酒的酒款（由倒排索引查詢）
+            selected = [k for k, v in st.session_state.preferences.get('liquors', {}).items() if v]
+            liquor_matches = None
+            if selected:
+                liquor_index = get_liquor_index(df)
+                liquor_matches = [matching_drinks(liquor_index, row, selected) for row in st.session_state.route]
+            display_route_panel(recommendations, st.session_state.preferences, st.session_state.route_legs,
+                                st.session_state.route_anchor_legs, liquor_matches)
         
         with col2:
             st.header("🗺️ 互動式路線地圖")
             
-            # 動態風格篩選器標題和顯示全部按鈕
-            unique_styles = get_unique_bar_styles(st.session_state.recommendations)
-            selected_filter = None
+            # 動態風格篩選器 - 每種風格一個圖層，在瀏覽器端切換，不需重新執行腳本
+            unique_styles = get_unique_bar_styles(recommendations, df.attrs['style_vocab'])
+            st.subheader("🎛️ 地圖篩選器")
             
-            # 標題和顯示全部按鈕並排
             if unique_styles:
-                title_col, button_col = st.columns([3, 1])
-                with title_col:
-                    st.subheader("🎛️ 地圖篩選器")
-                with button_col:
-                    # 使用 success 類型的按鈕來區分顏色
-                    if st.button("🔍 顯示全部", type="primary", use_container_width=True, key="show_all_bars"):
-                        selected_filter = None  # 顯示所有酒吧
-            else:
-                st.subheader("🎛️ 地圖篩選器")
-            
-            if unique_styles:
-                # 根據風格數量自動調整欄數，確保按鈕文字完整顯示
-                num_styles = len(unique_styles)
-                
-                # 減少每行的按鈕數量，給更多空間顯示完整文字
-                if num_styles <= 3:
-                    num_cols = num_styles
-                elif num_styles <= 6:
-                    num_cols = 3  # 每行3個，給更多空間
-                else:
-                    num_cols = 4  # 每行4個，平衡空間和顯示
-                
-                # 計算需要的行數
-                num_rows = (num_styles + num_cols - 1) // num_cols
-                
-                # 風格名稱對應的emoji和顯示名稱
-                style_display = {
-                    '夜店型酒吧': {'emoji': '🌃', 'name': '夜店型酒吧'},
-                    '立飲酒吧': {'emoji': '🍺', 'name': '立飲酒吧'},
-                    '餐酒館': {'emoji': '🍽️', 'name': '餐酒館'},
-                    '精緻酒吧': {'emoji': '✨', 'name': '精緻酒吧'},
-                    '啤酒專門店': {'emoji': '🍻', 'name': '啤酒專門店'},
-                    '威士忌酒吧': {'emoji': '🥃', 'name': '威士忌酒吧'},
-                    '茶酒酒吧': {'emoji': '🍵', 'name': '茶酒酒吧'},
-                    '咖啡餐酒館': {'emoji': '☕', 'name': '咖啡餐酒館'},
-                    '音樂酒吧': {'emoji': '🎵', 'name': '音樂酒吧'},
-                    '運動酒吧': {'emoji': '⚽', 'name': '運動酒吧'},
-                    '露天酒吧': {'emoji': '🌙', 'name': '露天酒吧'},
-                    '主題酒吧': {'emoji': '🎭', 'name': '主題酒吧'},
-                    '調酒吧': {'emoji': '🍸', 'name': '調酒吧'},
-                    '清酒吧': {'emoji': '🍶', 'name': '清酒吧'}
-                }
-                
-                # 按行顯示風格按鈕
-                for row in range(num_rows):
-                    start_idx = row * num_cols
-                    end_idx = min(start_idx + num_cols, num_styles)
-                    row_styles = unique_styles[start_idx:end_idx]
-                    
-                    # 為這一行創建欄位，確保有足夠空間
-                    filter_cols = st.columns(len(row_styles))
-                    
-                    for col_idx, style in enumerate(row_styles):
-                        with filter_cols[col_idx]:
-                            display_info = style_display.get(style, {'emoji': '🏪', 'name': style})
-                            # 確保使用完整的名稱
-                            button_text = f"{display_info['emoji']} {display_info['name']}"
-                            if st.button(button_text, 
-                                       use_container_width=True, 
-                                       key=f"filter_{style}_{row}_{col_idx}"):
-                                selected_filter = [style]
-            else:
-                st.info("🔍 生成推薦路線後，將顯示相應的風格篩選器")
-            
-            # 創建並顯示地圖
-            if unique_styles:
-                route_map = create_interactive_map(st.session_state.recommendations, selected_filter)
-                if route_map:
-                    folium_static(route_map, width=1000, height=500)
+                st.caption("使用地圖右上角的圖層選單勾選要顯示的酒吧風格")
+                with stage('map_html'):
+                    map_html = render_route_map_html(recommendations, unique_styles, st.session_state.route_legs,
+                                                     st.session_state.route_anchor_legs)
+                with stage('map_embed'):
+                    components.html(map_html, width=MAP_WIDTH, height=MAP_HEIGHT + 10)
             else:
                 st.info("📍 請先生成推薦路線以查看地圖")
     
@@ -971,7 +1063,7 @@ def main():
         1. **設定偏好**: 在左側面板選擇您的偏好
         2. **生成路線**: 點擊「生成推薦路線」按鈕
         3. **查看結果**: 左側查看詳細路線，右側查看地圖
-        4. **互動篩選**: 使用地圖下方的按鈕篩選不同風格
+        4. **互動篩選**: 勾選地圖右上角的圖層選單，顯示或隱藏不同風格的酒吧
         
         👈 **請先在左側設定您的偏好來開始！**
         """)
@@ -990,6 +1082,9 @@ def main():
         with col4:
             avg_price = df['price_level'].mean() * 400
             st.metric("💰 平均價位", f"NT${avg_price:.0f}")
+    
+    if timing_slot is not None:
+        show_stage_timings(timing_slot, timer)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
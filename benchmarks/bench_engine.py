@@ -0,0 +1,178 @@
+"""推薦流程基準測試 - 量測評分、推薦、路線優化、地圖與面板產生的時間，結果寫成 JSON
+
+在 all_info_0522.csv 與 1k / 10k / 100k 間酒吧的合成資料上執行，方便追蹤每次修改的效能變化。
+
+    python benchmarks/bench_engine.py                          # 全部規模
+    python benchmarks/bench_engine.py --sizes 1000 --repeat 3  # 只跑 1k
+    python benchmarks/bench_engine.py --output results.json
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alco_engine import (  # noqa: E402
+    DATA_PATH, DISTANCE_MATRIX_MAX_N, build_distance_matrix, build_leg_table, calculate_advanced_score,
+    calculate_scores, calculate_scores_batch, get_smart_recommendations, load_catalogue, optimize_route,
+    synthetic_catalogue,
+)
+
+APP_PATH = os.path.join(ROOT, 'alco_run_v24.py')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = [1000, 10000, 100000]
+# 逐列參考評分太慢，超過此數量只量測向量化版本
+REFERENCE_SCORE_MAX_N = 10000
+
+# 批次評分的偏好組數（PROFILES 重複排列）
+BATCH_PROFILES = 100
+
+# 固定的偏好組合，確保每次量測的工作量相同
+PROFILES = [
+    {
+        'time_start': '20:00', 'time_end': '02:00', 'weekday': '星期五',
+        'bar_styles': {'精緻酒吧': True, '威士忌酒吧': True},
+        'music_types': {'Jazz': True},
+        'price_point': 800, 'venue_type': '兩者皆可',
+    },
+    {
+        'time_start': '19:00', 'time_end': '23:00', 'weekday': '星期二',
+        'bar_styles': {'沒有偏好': True},
+        'music_types': {'沒有偏好': True},
+        'price_point': 400, 'venue_type': '兩者皆可',
+    },
+]
+
+
+def load_app():
+    """以 bare mode 匯入 Streamlit app，取得地圖與面板的產生函式"""
+    logging.disable(logging.CRITICAL)
+    spec = importlib.util.spec_from_file_location('alco_app', APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    logging.disable(logging.NOTSET)
+    return app
+
+
+def timeit(fn, repeat, warmup=True):
+    """執行 fn repeat 次，回傳秒數統計；warmup 時先執行一次不計時（排除匯入與快取暖機）"""
+    if warmup:
+        fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'mean_s': statistics.fmean(times),
+        'repeat': repeat,
+    }
+
+
+def bench_catalogue(df, app, repeat):
+    """對一份資料表量測各階段；回傳 {階段名稱: 統計}"""
+    n = len(df)
+    results = {}
+
+    if n <= DISTANCE_MATRIX_MAX_N:
+        lats = df['geometry_location_lat'].to_numpy()
+        lngs = df['geometry_location_lng'].to_numpy()
+        results['distance_matrix'] = timeit(lambda: build_distance_matrix(lats, lngs), 1, warmup=False)
+        dist = build_distance_matrix(lats, lngs)
+    else:
+        dist = None
+
+    batch = (PROFILES * BATCH_PROFILES)[:BATCH_PROFILES]
+    results[f'score_batch[{BATCH_PROFILES}]'] = timeit(lambda: calculate_scores_batch(df, batch), repeat)
+
+    for i, prefs in enumerate(PROFILES):
+        if n <= REFERENCE_SCORE_MAX_N:
+            results[f'score_reference[{i}]'] = timeit(
+                lambda: [calculate_advanced_score(bar, prefs) for _, bar in df.iterrows()], 1, warmup=False
+            )
+        results[f'score_vectorized[{i}]'] = timeit(lambda: calculate_scores(df, prefs), repeat)
+        results[f'recommend[{i}]'] = timeit(
+            lambda: get_smart_recommendations(df, prefs, dist=dist), repeat
+        )
+
+        route = get_smart_recommendations(df, prefs, dist=dist)
+        results[f'optimize_route[{i}]'] = timeit(lambda: optimize_route(df, route, dist), repeat)
+
+        recommendations = df.iloc[route].reset_index(drop=True)
+        legs = build_leg_table(df, route, dist)
+        styles = app.get_unique_bar_styles(recommendations, df.attrs['style_vocab'])
+        results[f'create_interactive_map[{i}]'] = timeit(
+            lambda: app.create_interactive_map(recommendations, styles, legs), repeat
+        )
+        results[f'route_panel_html[{i}]'] = timeit(
+            lambda: app.build_route_panel_html(recommendations, prefs, legs), repeat
+        )
+    return results
+
+
+def git_commit():
+    """目前的 git commit（無法取得時回傳 None）"""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='量測推薦流程各階段的執行時間')
+    parser.add_argument('--sizes', type=int, nargs='*', default=DEFAULT_SIZES, help='合成資料的酒吧數')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='結果 JSON 路徑（預設 benchmarks/results/<時間>.json）')
+    args = parser.parse_args()
+
+    app = load_app()
+    catalogues = [('csv', lambda: load_catalogue(os.path.join(ROOT, DATA_PATH)))]
+    catalogues += [(f'synthetic-{n}', lambda n=n: synthetic_catalogue(n, args.seed)) for n in args.sizes]
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'seed': args.seed,
+        'catalogues': {},
+    }
+    for name, build in catalogues:
+        t0 = time.perf_counter()
+        df = build()
+        build_s = time.perf_counter() - t0
+        print(f'⏱️ {name}（{len(df)} 間酒吧）', file=sys.stderr)
+        stages = bench_catalogue(df, app, args.repeat)
+        report['catalogues'][name] = {'n_bars': len(df), 'build_s': build_s, 'stages': stages}
+        for stage, stats in stages.items():
+            print(f'   {stage:<28} {stats["median_s"] * 1000:10.2f} ms', file=sys.stderr)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'✅ 結果已寫入 {output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""冷啟動基準測試 - 量測歡迎頁的首次繪製時間，超出預算時以非零狀態結束
+
+每次量測都在全新的 Python 行程中以 streamlit AppTest 執行 alco_run_v24.py，
+記錄「匯入 + 第一次 run()」的時間，並檢查歡迎頁沒有載入不需要的重量級模組。
+
+    python benchmarks/bench_startup.py               # 與 startup_budget.json 比較
+    python benchmarks/bench_startup.py --runs 9 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'alco_run_v24.py')
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+# 歡迎頁不應載入的模組（只在產生路線後才需要）
+DEFERRED_MODULES = ['folium', 'streamlit_folium', 'geopy', 'plotly']
+
+# 在子行程中執行：先匯入 streamlit 本身（不計入），再量測 app 的第一次繪製
+_CHILD = r'''
+import json, logging, sys, time
+logging.disable(logging.CRITICAL)
+from streamlit.testing.v1 import AppTest
+app_path, deferred = sys.argv[1], sys.argv[2].split(',')
+at = AppTest.from_file(app_path, default_timeout=120)
+# streamlit 本身可能已載入部分模組（例如 plotly），只計算 app 額外載入的
+preloaded = set(sys.modules)
+t0 = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - t0
+print(json.dumps({
+    'first_paint_s': elapsed,
+    'exception': bool(at.exception),
+    'loaded': [m for m in deferred if m in sys.modules and m not in preloaded],
+}))
+'''
+
+
+def measure_once():
+    """在全新行程中量測一次首次繪製時間"""
+    out = subprocess.run(
+        [sys.executable, '-c', _CHILD, APP_PATH, ','.join(DEFERRED_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='量測 Streamlit 歡迎頁的冷啟動時間')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', default=BUDGET_PATH, help='預算 JSON 路徑')
+    parser.add_argument('--output', help='將結果寫入 JSON 檔')
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    times = sorted(s['first_paint_s'] for s in samples)
+    result = {
+        'runs': args.runs,
+        'first_paint_median_s': statistics.median(times),
+        'first_paint_min_s': times[0],
+        'first_paint_max_s': times[-1],
+        'loaded_deferred_modules': sorted({m for s in samples for m in s['loaded']}),
+        'exception': any(s['exception'] for s in samples),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    failures = []
+    if result['exception']:
+        failures.append('歡迎頁執行時發生例外')
+    if result['loaded_deferred_modules']:
+        failures.append(f"歡迎頁載入了延後模組：{', '.join(result['loaded_deferred_modules'])}")
+    if os.path.exists(args.budget):
+        with open(args.budget, encoding='utf-8') as f:
+            budget = json.load(f)
+        if result['first_paint_median_s'] > budget['first_paint_median_s']:
+            failures.append(
+                f"首次繪製 {result['first_paint_median_s']:.3f}s 超出預算 {budget['first_paint_median_s']:.3f}s"
+            )
+
+    for message in failures:
+        print(f"❌ {message}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""向量化評分、批次評分與逐列參考實作 calculate_advanced_score 的結果必須逐位元相同"""
+import random
+
+import numpy as np
+import pytest
+
+from alco_engine import (LIQUORS, calculate_advanced_score, calculate_scores, calculate_scores_batch,
+                         load_catalogue, synthetic_catalogue)
+
+STYLES = ['夜店型酒吧', '立飲酒吧', '餐酒館', '精緻酒吧', '啤酒專門店', '威士忌酒吧', '茶酒酒吧', '咖啡餐酒館', '沒有偏好']
+MUSICS = ['Hip-Hop', 'EDM', 'Jazz', 'Lo-fi', 'Rock', 'R&B', 'Pop', 'Electronic', '沒有偏好']
+
+
+def random_preferences(rng, with_liquors=True):
+    """隨機偏好；約三成的選項被勾選，價位 200 ~ 2000"""
+    preferences = {
+        'price_point': rng.randrange(200, 2050, 50),
+        'bar_styles': {s: rng.random() < 0.3 for s in STYLES},
+        'music_types': {m: rng.random() < 0.3 for m in MUSICS},
+    }
+    if with_liquors:
+        preferences['liquors'] = {liquor: rng.random() < 0.15 for liquor in LIQUORS + ['沒有偏好']}
+    return preferences
+
+
+@pytest.fixture(scope='module', params=['csv', 'synthetic'])
+def catalogue(request):
+    if request.param == 'csv':
+        return load_catalogue(use_cache=False)
+    return synthetic_catalogue(300, seed=3)
+
+
+def reference_scores(df, preferences):
+    return np.array([calculate_advanced_score(row, preferences) for _, row in df.iterrows()])
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_scores_match_reference(catalogue, seed):
+    rng = random.Random(seed)
+    for with_liquors in (False, True):
+        preferences = random_preferences(rng, with_liquors)
+        np.testing.assert_array_equal(calculate_scores(catalogue, preferences),
+                                      reference_scores(catalogue, preferences))
+
+
+def test_no_preference_matches_reference(catalogue):
+    preferences = {'price_point': 600, 'bar_styles': {'沒有偏好': True},
+                   'music_types': {'沒有偏好': True}, 'liquors': {'沒有偏好': True}}
+    np.testing.assert_array_equal(calculate_scores(catalogue, preferences),
+                                  reference_scores(catalogue, preferences))
+
+
+def test_scores_within_unit_interval(catalogue):
+    rng = random.Random(42)
+    for _ in range(20):
+        scores = calculate_scores(catalogue, random_preferences(rng))
+        assert scores.min() >= 0.0 and scores.max() <= 1.0
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 256])
+def test_batch_rows_match_single_profile(catalogue, chunk_size):
+    rng = random.Random(chunk_size)
+    profiles = [random_preferences(rng, with_liquors=i % 3 != 0) for i in range(40)]
+    batch = calculate_scores_batch(catalogue, profiles, chunk_size=chunk_size)
+    assert batch.shape == (len(profiles), len(catalogue))
+    np.testing.assert_array_equal(batch, np.vstack([calculate_scores(catalogue, p) for p in profiles]))
+
+
+def test_batch_empty_profiles(catalogue):
+    assert calculate_scores_batch(catalogue, []).shape == (0, len(catalogue))
@@ -0,0 +1,47 @@
+"""top_k / streaming_top_k 必須與 pd.Series.nlargest 相同，包含同分時的順序"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from alco_engine import streaming_top_k, top_k
+
+
+def random_scores(rng, n):
+    """只取少數幾種分數值，確保有大量同分"""
+    return rng.choice(np.round(rng.random(5), 3), size=n)
+
+
+def expected(scores, k, index):
+    return pd.Series(scores, index=index).nlargest(k).index.to_numpy()
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_top_k_matches_nlargest(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 200))
+    scores = random_scores(rng, n)
+    index = rng.permutation(n) + 1000
+    for k in (1, 3, 12, n - 1, n, n + 5):
+        np.testing.assert_array_equal(top_k(scores, k), expected(scores, k, np.arange(n)))
+        np.testing.assert_array_equal(top_k(scores, k, index), expected(scores, k, index))
+
+
+def test_top_k_empty():
+    assert len(top_k([], 5)) == 0
+    assert len(top_k([0.5, 0.7], 0)) == 0
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_streaming_top_k_matches_top_k(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 500))
+    scores = random_scores(rng, n)
+    index = np.array([f'place_{i}' for i in rng.permutation(n)])
+    cuts = np.sort(rng.integers(0, n + 1, size=int(rng.integers(0, 6))))
+    shards = [(s, i) for s, i in zip(np.split(scores, cuts), np.split(index, cuts))]
+    for k in (1, 6, 12, n):
+        np.testing.assert_array_equal(streaming_top_k(iter(shards), k), expected(scores, k, index))
+
+
+def test_streaming_top_k_no_shards():
+    assert len(streaming_top_k(iter([]), 5)) == 0